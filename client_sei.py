@@ -1,14 +1,26 @@
 #!/usr/bin/env python3
 import gi
 gi.require_version("Gst", "1.0")
-from gi.repository import Gst, GLib
-import argparse, re, json, sys, cv2, numpy as np, queue, threading
+gi.require_version("GstRtp", "1.0")
+from gi.repository import Gst, GLib, GstRtp
+import argparse, re, json, os, sys, time, cv2, numpy as np, queue, threading, struct, collections
 
 Gst.init(None)
 
 # -------- SEI extraction --------
-def extract_sei_json(data: bytes):
-    """Extract SEI JSON with proper nested brace handling"""
+CODECS = ("h264", "h265")
+
+
+def _nal_is_sei(codec: str, data: bytes, nal_start: int) -> bool:
+    if codec == "h265":
+        # prefix (39) or suffix (40) SEI, 2-byte NAL header
+        return (data[nal_start] >> 1) & 0x3F in (39, 40)
+    return data[nal_start] & 0x1F == 6
+
+
+def iter_sei_udu(data: bytes, codec: str = "h264"):
+    """Yield (uuid_bytes, user_data) for every user_data_unregistered SEI in an AU"""
+    hdr_len = 2 if codec == "h265" else 1
     pos = 0
     while pos < len(data) - 4:
         # Look for start codes
@@ -28,9 +40,7 @@ def extract_sei_json(data: bytes):
         if nal_start >= len(data):
             break
             
-        nal_type = data[nal_start] & 0x1F
-        
-        if nal_type == 6:  # SEI
+        if _nal_is_sei(codec, data, nal_start):
             # Find next start code to determine SEI size
             next_4 = data.find(b"\x00\x00\x00\x01", nal_start)
             next_3 = data.find(b"\x00\x00\x01", nal_start)
@@ -42,10 +52,11 @@ def extract_sei_json(data: bytes):
             else:
                 sei_end = len(data)
             
-            sei_data = data[nal_start:sei_end]
+            # EBSP -> RBSP: drop emulation-prevention bytes (binary chunk headers)
+            sei_data = data[nal_start:sei_end].replace(b"\x00\x00\x03", b"\x00\x00")
             
             # Parse SEI payload
-            idx = 1  # Skip NAL header
+            idx = hdr_len  # Skip NAL header
             
             # Read payload type
             payload_type = 0
@@ -66,65 +77,483 @@ def extract_sei_json(data: bytes):
                 idx += 1
             
             # Check if it's user_data_unregistered (type 5)
-            if payload_type == 5:
-                # Skip UUID (16 bytes)
-                if idx + 16 <= len(sei_data):
-                    idx += 16
-                    
-                    # Extract user data
-                    user_data = sei_data[idx:idx+payload_size-16]
-                    
-                    # Extract complete JSON by counting braces
-                    json_start = user_data.find(b'{')
-                    if json_start != -1:
-                        brace_count = 0
-                        json_end = json_start
-                        for i in range(json_start, len(user_data)):
-                            if user_data[i:i+1] == b'{':
-                                brace_count += 1
-                            elif user_data[i:i+1] == b'}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    json_end = i + 1
-                                    break
-                        
-                        if json_end > json_start:
-                            try:
-                                json_str = user_data[json_start:json_end].decode('utf-8')
-                                meta = json.loads(json_str)
-                                yield meta
-                            except Exception:
-                                pass
+            if payload_type == 5 and idx + 16 <= len(sei_data):
+                uuid_bytes = sei_data[idx:idx+16]
+                idx += 16
+                yield uuid_bytes, sei_data[idx:idx+payload_size-16]
         
         pos = nal_start + 1
 
 
+# Server splits payloads above --meta-budget into parts with this UUID
+SEI_CHUNK_UUID = bytes.fromhex("6c4b8b0443c341a293b73a7b70f7ef01")
+SEI_CHUNK_HEADER = struct.Struct(">HBB")  # seq (u16), part index, part count
+
+
+class SeiReassembler:
+    """Collect chunked SEI parts until every part of a seq has arrived"""
+
+    def __init__(self, max_pending=8):
+        self.max_pending = max_pending
+        self._pending = collections.OrderedDict()  # seq -> {part: bytes}
+        self.incomplete = 0  # seqs dropped before all parts arrived
+
+    def add(self, user_data: bytes):
+        """Feed one part; return the whole payload once complete, else None"""
+        if len(user_data) < SEI_CHUNK_HEADER.size:
+            return None
+        seq, part, count = SEI_CHUNK_HEADER.unpack_from(user_data)
+        parts = self._pending.setdefault(seq, {})
+        parts[part] = user_data[SEI_CHUNK_HEADER.size:]
+        if len(parts) == count:
+            del self._pending[seq]
+            return b"".join(parts[i] for i in range(count))
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.incomplete += 1
+        return None
+
+
+def extract_sei_json(data: bytes, codec: str = "h264", reassembler: SeiReassembler = None):
+    """Extract SEI JSON with proper nested brace handling"""
+    if reassembler is None:
+        reassembler = SeiReassembler()  # parts of one payload share an AU
+    for uuid_bytes, user_data in iter_sei_udu(data, codec):
+        if uuid_bytes == SEI_CHUNK_UUID:
+            user_data = reassembler.add(user_data)
+            if user_data is None:
+                continue
+        # Extract complete JSON by counting braces
+        json_start = user_data.find(b'{')
+        if json_start != -1:
+            brace_count = 0
+            json_end = json_start
+            for i in range(json_start, len(user_data)):
+                if user_data[i:i+1] == b'{':
+                    brace_count += 1
+                elif user_data[i:i+1] == b'}':
+                    brace_count -= 1
+                    if brace_count == 0:
+                        json_end = i + 1
+                        break
+            
+            if json_end > json_start:
+                try:
+                    json_str = user_data[json_start:json_end].decode('utf-8')
+                    meta = json.loads(json_str)
+                    yield meta
+                except Exception:
+                    pass
+
+
+
+# -------- RTP header-extension extraction --------
+HDREXT_ID = 1  # must match server.py
+
+
+def read_hdrext_payload(buf: Gst.Buffer):
+    """Concatenate every two-byte header-ext element with HDREXT_ID, or None"""
+    ok, rtp = GstRtp.RTPBuffer.map(buf, Gst.MapFlags.READ)
+    if not ok:
+        return None
+    try:
+        parts = []
+        nth = 0
+        while True:
+            found, _appbits, data = rtp.get_extension_twobytes_header(HDREXT_ID, nth)
+            if not found:
+                break
+            parts.append(bytes(data))
+            nth += 1
+    finally:
+        rtp.unmap()
+    return b"".join(parts) if parts else None
+
+
+def attach_hdrext_reader(depay: Gst.Element, on_meta):
+    """Read metadata from RTP header extensions on the depayloader's sink pad"""
+    def handle(buf):
+        payload = read_hdrext_payload(buf)
+        if payload:
+            try:
+                on_meta(json.loads(payload))
+            except ValueError:
+                pass
+
+    def on_probe(pad, info):
+        if info.type & Gst.PadProbeType.BUFFER_LIST:
+            blist = info.get_buffer_list()
+            for i in range(blist.length()):
+                handle(blist.get(i))
+        else:
+            handle(info.get_buffer())
+        return Gst.PadProbeReturn.OK
+
+    depay.get_static_pad("sink").add_probe(
+        Gst.PadProbeType.BUFFER | Gst.PadProbeType.BUFFER_LIST, on_probe
+    )
+
+
+# -------- latency / jitter analytics --------
+LATENCY_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class RollingWindow:
+    """Last `window` samples as percentiles + a coarse histogram"""
+
+    def __init__(self, window=1000, buckets=LATENCY_BUCKETS_MS):
+        self._samples = collections.deque(maxlen=window)
+        self.buckets = buckets
+        self.count = 0
+
+    def add(self, value: float):
+        self._samples.append(value)
+        self.count += 1
+
+    def summary(self) -> dict:
+        if not self._samples:
+            return {"n": self.count}
+        arr = np.asarray(self._samples, np.float64)
+        p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+        counts = np.bincount(np.searchsorted(self.buckets, arr), minlength=len(self.buckets) + 1)
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "n": self.count,
+            "p50": round(float(p50), 3),
+            "p90": round(float(p90), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(arr.max()), 3),
+            "hist": dict(zip(labels, counts.tolist())),
+        }
+
+
+class LatencyTracker:
+    """
+    Per-frame timing from the server's stamps (server clock):
+      ts_ns  capture time, tx_ns  frame handed to the encoder.
+
+      server_ms   tx - ts: capture, inference, queueing (one clock, no offset needed)
+      transit_ms  recv - tx - offset: encode, network, depacketize
+      e2e_ms      recv - ts - offset
+      client_us   time spent here pulling the AU and parsing its SEI
+
+    Without synced clocks the offset is the smallest recv - tx seen over the
+    last `offset_window` frames, so transit is relative to the best path
+    observed. Pass clock_offset_ns (0 for NTP/PTP-synced hosts) to fix it.
+    Frame ids come from the server's hub: gaps count frames that never
+    arrived, including ones the server skipped for this stream.
+
+    After mark_start() (= PLAY), also records time to the first metadata and
+    to the first frame with detections.
+    """
+
+    def __init__(self, clock_offset_ns=None, offset_window=300):
+        self.fixed_offset_ns = clock_offset_ns
+        self._raw_transit = collections.deque(maxlen=offset_window)
+        self.offset_ns = clock_offset_ns or 0
+        self.server_ms = RollingWindow()
+        self.transit_ms = RollingWindow()
+        self.e2e_ms = RollingWindow()
+        self.interarrival_ms = RollingWindow()
+        self.client_us = RollingWindow()
+        self.jitter_ms = 0.0  # RFC 3550 interarrival jitter estimate
+        self.frames = 0
+        self.gaps = 0
+        self.lost = 0
+        self.reordered = 0
+        self.stale = 0  # frames the server repeated while its source was stalled
+        self._last_frame = None
+        self._last_recv = None
+        self._last_tx = None
+        self.start_ns = None
+        self.first_meta_ms = None
+        self.first_detection_ms = None
+        self.joined_on_snapshot = False  # first payload was the server's join snapshot
+
+    def mark_start(self):
+        self.start_ns = time.time_ns()
+
+    def add(self, meta: dict, recv_ns: int = None, client_ns: int = None):
+        recv_ns = recv_ns or time.time_ns()
+        ts_ns = meta.get("ts_ns")
+        frame_id = meta.get("frame")
+        if ts_ns is None or frame_id is None:
+            return
+        tx_ns = meta.get("tx_ns", ts_ns)
+        self.frames += 1
+        if meta.get("stale"):
+            self.stale += 1
+        if self.start_ns is not None:
+            if self.first_meta_ms is None:
+                self.first_meta_ms = (recv_ns - self.start_ns) / 1e6
+                self.joined_on_snapshot = bool(meta.get("join"))
+            if self.first_detection_ms is None and meta.get("yolo"):
+                self.first_detection_ms = (recv_ns - self.start_ns) / 1e6
+
+        if self._last_frame is not None:
+            step = frame_id - self._last_frame
+            if step > 1:
+                self.gaps += 1
+                self.lost += step - 1
+            elif step <= 0:
+                self.reordered += 1
+        if self._last_frame is None or frame_id > self._last_frame:
+            self._last_frame = frame_id
+
+        if self._last_recv is not None:
+            self.interarrival_ms.add((recv_ns - self._last_recv) / 1e6)
+            # difference in transit between consecutive frames
+            d = ((recv_ns - self._last_recv) - (tx_ns - self._last_tx)) / 1e6
+            self.jitter_ms += (abs(d) - self.jitter_ms) / 16
+        self._last_recv = recv_ns
+        self._last_tx = tx_ns
+
+        raw = recv_ns - tx_ns
+        if self.fixed_offset_ns is None:
+            self._raw_transit.append(raw)
+            self.offset_ns = min(self._raw_transit)
+        self.server_ms.add((tx_ns - ts_ns) / 1e6)
+        self.transit_ms.add((raw - self.offset_ns) / 1e6)
+        self.e2e_ms.add((recv_ns - ts_ns - self.offset_ns) / 1e6)
+        if client_ns is not None:
+            self.client_us.add(client_ns / 1e3)
+
+    def summary(self) -> dict:
+        return {
+            "frames": self.frames,
+            "lost": self.lost,
+            "gaps": self.gaps,
+            "reordered": self.reordered,
+            "stale": self.stale,
+            "clock_offset_ms": round(self.offset_ns / 1e6, 3),
+            "offset": "fixed" if self.fixed_offset_ns is not None else "min-filter",
+            "jitter_ms": round(self.jitter_ms, 3),
+            "e2e_ms": self.e2e_ms.summary(),
+            "server_ms": self.server_ms.summary(),
+            "transit_ms": self.transit_ms.summary(),
+            "interarrival_ms": self.interarrival_ms.summary(),
+            "client_us": self.client_us.summary(),
+            "join": {
+                "first_meta_ms": self.first_meta_ms and round(self.first_meta_ms, 1),
+                "first_detection_ms": self.first_detection_ms and round(self.first_detection_ms, 1),
+                "snapshot": self.joined_on_snapshot,
+            },
+        }
+
+
+# -------- keyframe-only preview --------
+class KeyframeGate:
+    """
+    Buffer probe in front of the decoder that only lets keyframes through,
+    at most one per `min_interval` seconds of stream time. Delta units never
+    reach avdec, so a preview costs one decode per GOP (or fewer).
+    """
+
+    def __init__(self, min_interval=0.0):
+        self.min_interval_ns = int(min_interval * Gst.SECOND)
+        self._last_pts = None
+        self.passed = 0
+        self.dropped = 0
+
+    def attach(self, element: Gst.Element, pad_name="sink"):
+        element.get_static_pad(pad_name).add_probe(Gst.PadProbeType.BUFFER, self._on_probe)
+
+    def _on_probe(self, pad, info):
+        buf = info.get_buffer()
+        pts = buf.pts
+        too_soon = (
+            self._last_pts is not None and pts != Gst.CLOCK_TIME_NONE
+            and pts - self._last_pts < self.min_interval_ns
+        )
+        if buf.has_flags(Gst.BufferFlags.DELTA_UNIT) or too_soon:
+            self.dropped += 1
+            return Gst.PadProbeReturn.DROP
+        self._last_pts = pts
+        self.passed += 1
+        return Gst.PadProbeReturn.OK
+
+
+def draw_detections(frame: np.ndarray, meta: dict, scale: float):
+    """Boxes from `meta` (stream pixels) onto `frame`, scaled by `scale`"""
+    for det in meta.get("yolo", []):
+        x1, y1, x2, y2 = (int(v * scale) for v in det.get("xyxy", (0, 0, 0, 0)))
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 1)
+        cv2.putText(frame, f"{det.get('name')} {det.get('conf', 0):.2f}", (x1, max(y1 - 3, 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.35, (0, 255, 0), 1)
+
+
+def print_meta(meta: dict):
+    frame_id = meta.get("frame")
+    yolo = meta.get("yolo", [])
+    if yolo:
+        print(f"[frame {frame_id}] {len(yolo)} detections:")
+        for det in yolo:
+            print(f"  - {det.get('name')} {det.get('conf'):.2f} {det.get('xyxy')}")
+        sys.stdout.flush()
+
+
+def build_metadata_only_pipeline(url: str, on_meta):
+    """
+    SETUP only the server's metadata RTP stream (pay1, started with
+    --metadata-track): no video is depayloaded or decoded at all.
+    """
+    pipeline = Gst.parse_launch(f"""
+        rtspsrc name=src location={url} latency=0
+        rtpgstdepay name=metadepay !
+            appsink name=meta_sink emit-signals=true sync=false
+    """)
+    src = pipeline.get_by_name("src")
+    depay = pipeline.get_by_name("metadepay")
+    meta_sink = pipeline.get_by_name("meta_sink")
+
+    def on_select_stream(_src, num, caps):
+        # only the application/x-yolo-meta stream gets a SETUP
+        return caps.get_structure(0).get_value("media") == "application"
+
+    def on_pad_added(_src, pad):
+        sinkpad = depay.get_static_pad("sink")
+        if not sinkpad.is_linked():
+            pad.link(sinkpad)
+
+    def on_meta_sample(sink):
+        sample = sink.emit("pull-sample")
+        if not sample:
+            return Gst.FlowReturn.OK
+        buf = sample.get_buffer()
+        ok, mapinfo = buf.map(Gst.MapFlags.READ)
+        if ok:
+            data = bytes(mapinfo.data)
+            buf.unmap(mapinfo)
+            try:
+                on_meta(json.loads(data))
+            except ValueError:
+                pass
+        return Gst.FlowReturn.OK
+
+    src.connect("select-stream", on_select_stream)
+    src.connect("pad-added", on_pad_added)
+    meta_sink.connect("new-sample", on_meta_sample)
+    return pipeline
+
 
 def main():
     ap = argparse.ArgumentParser(description="RTSP SEI metadata client (safe main-thread loop)")
     ap.add_argument("--input", required=True, help="rtsp:// URL")
     ap.add_argument("--no-video", action="store_true", help="disable video window")
+    ap.add_argument("--codec", choices=CODECS, default="h264", help="stream codec (default h264)")
+    ap.add_argument(
+        "--metadata-only",
+        action="store_true",
+        help="SETUP only the metadata RTP track (server started with --metadata-track); implies --no-video",
+    )
+    ap.add_argument(
+        "--transport",
+        choices=["sei", "hdrext"],
+        default="sei",
+        help="where the server puts per-frame metadata: sei (default) or hdrext (RTP header extension)",
+    )
+    ap.add_argument(
+        "--clock-offset",
+        default="auto",
+        help="server-to-client clock offset: auto (min-filter estimate, default), "
+             "synced (NTP/PTP hosts, offset 0) or a fixed value in ms",
+    )
+    ap.add_argument(
+        "--stats-interval",
+        type=float,
+        default=0.0,
+        help="print latency/jitter stats every N seconds (always printed on exit)",
+    )
+    ap.add_argument("--stats-file", help="also append each stats dump as a JSON line to this file")
+    ap.add_argument("--quiet", action="store_true", help="don't print per-frame detections")
+    ap.add_argument(
+        "--preview",
+        action="store_true",
+        help="thumbnail mode: decode keyframes only (delta frames are dropped before the "
+             "decoder), scaled down, with their boxes drawn on",
+    )
+    ap.add_argument(
+        "--preview-interval",
+        type=float,
+        default=1.0,
+        help="preview: at most one decoded keyframe per this many seconds (0 = every keyframe)",
+    )
+    ap.add_argument("--preview-width", type=int, default=320, help="preview: output width in pixels")
     args = ap.parse_args()
+    codec = args.codec
+    if args.metadata_only:
+        args.no_video = True
+    if args.clock_offset == "auto":
+        clock_offset_ns = None
+    elif args.clock_offset == "synced":
+        clock_offset_ns = 0
+    else:
+        clock_offset_ns = int(float(args.clock_offset) * 1e6)
+    latency = LatencyTracker(clock_offset_ns)
+    gate = KeyframeGate(args.preview_interval) if args.preview else None
+    cpu_start = (os.times(), time.monotonic())
+    # preview: decoded keyframes are paired with their metadata by PTS
+    meta_by_pts = collections.OrderedDict()
+    latest_meta = {}
+
+    def on_meta(meta, recv_ns=None, client_ns=None):
+        had_detection = latency.first_detection_ms is not None
+        latency.add(meta, recv_ns, client_ns)
+        if not had_detection and latency.first_detection_ms is not None:
+            print(f"⏱  first detection {latency.first_detection_ms:.0f} ms after PLAY "
+                  f"(first metadata {latency.first_meta_ms:.0f} ms)")
+        latest_meta["meta"] = meta
+        if not args.quiet:
+            print_meta(meta)
+
+    def report_stats():
+        stats = latency.summary()
+        times, wall0 = cpu_start
+        now = os.times()
+        cpu = (now.user - times.user) + (now.system - times.system)
+        stats["cpu_pct"] = round(100 * cpu / max(time.monotonic() - wall0, 1e-9), 1)
+        if gate is not None:
+            stats["preview"] = {"decoded": gate.passed, "gated": gate.dropped}
+        line = json.dumps(stats, separators=(",", ":"))
+        print(f"[latency] {line}")
+        if args.stats_file:
+            with open(args.stats_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return True
+
+    decode = f"avdec_{codec} ! videoconvert ! video/x-raw,format=BGR"
+    if args.preview:
+        # keyframes only (KeyframeGate on dec's sink pad); single-threaded decode so
+        # a lone keyframe isn't held back waiting for more frames; scale before BGR
+        decode = (
+            f"avdec_{codec} name=dec max-threads=1 ! videoscale ! videoconvert ! "
+            f"video/x-raw,format=BGR,width={args.preview_width},pixel-aspect-ratio=1/1"
+        )
 
     # Build pipeline - CRITICAL: force byte-stream format with start codes
     pipeline_str = f"""
         rtspsrc location={args.input} latency=0 !
-            rtph264depay ! 
-            video/x-h264,stream-format=byte-stream,alignment=au !
-            h264parse config-interval=-1 !
-            video/x-h264,stream-format=byte-stream,alignment=au !
+            rtp{codec}depay name=depay ! 
+            video/x-{codec},stream-format=byte-stream,alignment=au !
+            {codec}parse config-interval=-1 !
+            video/x-{codec},stream-format=byte-stream,alignment=au !
             tee name=t
 
             t. ! queue !
                 appsink name=sei_sink emit-signals=true sync=false
 
-            t. ! queue ! avdec_h264 ! videoconvert !
-                video/x-raw,format=BGR !
+            t. ! queue ! {decode} !
                 appsink name=video_sink emit-signals=true sync=false
     """
-    pipeline = Gst.parse_launch(pipeline_str)
-    sei_sink = pipeline.get_by_name("sei_sink")
-    video_sink = pipeline.get_by_name("video_sink")
+    sei_sink = video_sink = None  # --metadata-only has no appsinks
+    if args.metadata_only:
+        pipeline = build_metadata_only_pipeline(args.input, on_meta)
+    else:
+        pipeline = Gst.parse_launch(pipeline_str)
+        sei_sink = pipeline.get_by_name("sei_sink")
+        video_sink = pipeline.get_by_name("video_sink")
+        if gate is not None:
+            gate.attach(pipeline.get_by_name("dec"))
 
     frame_q: queue.Queue[np.ndarray] = queue.Queue(maxsize=1)
     stop_flag = {"run": True}
@@ -140,33 +569,38 @@ def main():
         h = caps.get_structure(0).get_value("height")
         ok, mapinfo = buf.map(Gst.MapFlags.READ)
         if ok:
-            frame = np.frombuffer(mapinfo.data, np.uint8).reshape((h, w, 3))
+            # copy: the mapping is gone once we unmap
+            frame = np.frombuffer(mapinfo.data, np.uint8).reshape((h, w, 3)).copy()
             buf.unmap(mapinfo)
             if not frame_q.full():
-                frame_q.put(frame)
+                frame_q.put((buf.pts, frame))
         return Gst.FlowReturn.OK
 
     def on_sei_sample(sink):
         sample = sink.emit("pull-sample")
         if not sample:
             return Gst.FlowReturn.OK
+        recv_ns = time.time_ns()
+        t0 = time.perf_counter_ns()
         buf = sample.get_buffer()
         ok, mapinfo = buf.map(Gst.MapFlags.READ)
         if ok:
             data = bytes(mapinfo.data)
             buf.unmap(mapinfo)
-            for meta in extract_sei_json(data):
-                frame_id = meta.get("frame")
-                yolo = meta.get("yolo", [])
-                if yolo:
-                    print(f"[frame {frame_id}] {len(yolo)} detections:")
-                    for det in yolo:
-                        print(f"  - {det.get('name')} {det.get('conf'):.2f} {det.get('xyxy')}")
-                    sys.stdout.flush()
+            for meta in extract_sei_json(data, codec):
+                on_meta(meta, recv_ns, time.perf_counter_ns() - t0)
+                if gate is not None:
+                    meta_by_pts[buf.pts] = meta
+                    while len(meta_by_pts) > 256:
+                        meta_by_pts.popitem(last=False)
         return Gst.FlowReturn.OK
 
-    sei_sink.connect("new-sample", on_sei_sample)
-    video_sink.connect("new-sample", on_video_sample)
+    if video_sink is not None:
+        if args.transport == "hdrext":
+            attach_hdrext_reader(pipeline.get_by_name("depay"), on_meta)
+        else:
+            sei_sink.connect("new-sample", on_sei_sample)
+        video_sink.connect("new-sample", on_video_sample)
 
     # ---------- bus handling ----------
     bus = pipeline.get_bus()
@@ -182,6 +616,7 @@ def main():
     bus.connect("message", on_bus_msg)
 
     # ---------- run ----------
+    latency.mark_start()
     pipeline.set_state(Gst.State.PLAYING)
     loop = GLib.MainLoop()
     print(f"✅ Connected to {args.input}")
@@ -193,7 +628,13 @@ def main():
             return False  # Stop the timeout
         
         try:
-            frame = frame_q.get_nowait()
+            pts, frame = frame_q.get_nowait()
+            if gate is not None:
+                # header-ext metadata has no AU PTS here: fall back to the newest
+                meta = meta_by_pts.get(pts) or latest_meta.get("meta")
+                caps = pipeline.get_by_name("dec").get_static_pad("sink").get_current_caps()
+                if meta and caps:
+                    draw_detections(frame, meta, frame.shape[1] / caps.get_structure(0).get_value("width"))
             cv2.imshow("RTSP Video", frame)
         except queue.Empty:
             pass
@@ -208,6 +649,8 @@ def main():
 
     if not args.no_video:
         GLib.timeout_add(30, on_frame_timeout)  # ~30fps display rate
+    if args.stats_interval > 0:
+        GLib.timeout_add(int(args.stats_interval * 1000), report_stats)
 
     try:
         loop.run()
@@ -218,6 +661,7 @@ def main():
         pipeline.set_state(Gst.State.NULL)
         if not args.no_video:
             cv2.destroyAllWindows()
+        report_stats()
         print("Shutting down...")
 
 if __name__ == "__main__":
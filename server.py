@@ -2,30 +2,62 @@
 import gi
 gi.require_version("Gst", "1.0")
 gi.require_version("GstRtspServer", "1.0")
-from gi.repository import Gst, GLib, GObject, GstRtspServer, GstBase
+gi.require_version("GstRtp", "1.0")
+gi.require_version("GstVideo", "1.0")
+from gi.repository import Gst, GLib, GObject, GstRtspServer, GstBase, GstRtp, GstVideo
 import cv2
 import json
 import time
 import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
 import uuid
+from multiprocessing import shared_memory
 import numpy as np
+import torch
 from ultralytics import YOLO
 
 # init GStreamer
 Gst.init(None)
 
 # ============================================================
-# Helper to build H.264 SEI user_data_unregistered
+# Helpers to build H.264 / H.265 SEI user_data_unregistered
 # ============================================================
 
 H264_START_CODE = b"\x00\x00\x00\x01"
 SEI_NAL_TYPE = 6  # H.264 SEI
+HEVC_PREFIX_SEI_NAL_TYPE = 39  # H.265 prefix SEI
+CODECS = ("h264", "h265")
 
-def build_h264_sei_udu(uuid_bytes: bytes, payload: bytes) -> bytes:
+
+def emulation_prevent(rbsp: bytes) -> bytes:
     """
-    Build an H.264 SEI NAL (user_data_unregistered) that carries `payload`.
-    payload should already be e.g. JSON bytes.
+    RBSP -> EBSP: insert 0x03 after every 00 00 that precedes a byte <= 3, so
+    binary payloads can't form a start code (or a byte parsers would strip)
+    inside the NAL. JSON never contains 00 00 and takes the fast path.
     """
+    if b"\x00\x00" not in rbsp:
+        return rbsp
+    out = bytearray()
+    zeros = 0
+    for b in rbsp:
+        if zeros >= 2 and b <= 3:
+            out.append(3)
+            zeros = 0
+        out.append(b)
+        zeros = zeros + 1 if b == 0 else 0
+    return bytes(out)
+
+
+def _sei_udu_rbsp(uuid_bytes: bytes, payload: bytes) -> bytes:
+    """sei_message() for user_data_unregistered, shared by H.264 and H.265 (escaped)."""
     # payload_type = 5 for user_data_unregistered
     pt = 5
     payload_type_bytes = b""
@@ -46,10 +78,110 @@ def build_h264_sei_udu(uuid_bytes: bytes, payload: bytes) -> bytes:
     payload_size_bytes += bytes([sz])
 
     # rbsp: payload-type + size + body + rbsp stop
-    sei_rbsp = payload_type_bytes + payload_size_bytes + body + b"\x80"
+    return emulation_prevent(payload_type_bytes + payload_size_bytes + body + b"\x80")
+
+
+def build_h264_sei_udu(uuid_bytes: bytes, payload: bytes) -> bytes:
+    """
+    Build an H.264 SEI NAL (user_data_unregistered) that carries `payload`.
+    payload should already be e.g. JSON bytes.
+    """
     # 1-byte NAL header (nal_unit_type = 6)
     nal_hdr = bytes([SEI_NAL_TYPE])
-    return H264_START_CODE + nal_hdr + sei_rbsp
+    return H264_START_CODE + nal_hdr + _sei_udu_rbsp(uuid_bytes, payload)
+
+
+def build_hevc_sei_udu(uuid_bytes: bytes, payload: bytes) -> bytes:
+    """
+    Build an H.265 prefix SEI NAL (user_data_unregistered) carrying `payload`.
+    """
+    # 2-byte NAL header: forbidden_zero(1) | type(6) | layer_id(6) | tid_plus1(3)
+    nal_hdr = bytes([HEVC_PREFIX_SEI_NAL_TYPE << 1, 0x01])
+    return H264_START_CODE + nal_hdr + _sei_udu_rbsp(uuid_bytes, payload)
+
+
+# Oversized payloads are split into parts, each its own SEI NAL with this
+# UUID and a (seq, part, count) header; clients reassemble them by seq.
+SEI_CHUNK_UUID = uuid.UUID("6c4b8b04-43c3-41a2-93b7-3a7b70f7ef01")
+SEI_CHUNK_HEADER = struct.Struct(">HBB")  # seq (u16), part index, part count
+
+
+def build_chunked_sei(codec: str, payload: bytes, max_part: int, seq: int) -> bytes:
+    """Split `payload` into <= max_part-byte SEI messages (at most 255 parts)"""
+    part_size = max(max_part, -(-len(payload) // 255))
+    parts = [payload[i:i + part_size] for i in range(0, len(payload), part_size)]
+    chunk_uuid = SEI_CHUNK_UUID.bytes
+    return b"".join(
+        build_sei_udu(codec, chunk_uuid, SEI_CHUNK_HEADER.pack(seq, i, len(parts)) + part)
+        for i, part in enumerate(parts)
+    )
+
+
+def encode_meta(meta: dict) -> bytes:
+    """Compact JSON encoding used for every metadata transport."""
+    return json.dumps(meta, separators=(",", ":")).encode("utf-8")
+
+
+def build_sei_udu(codec: str, uuid_bytes: bytes, payload: bytes) -> bytes:
+    if codec == "h265":
+        return build_hevc_sei_udu(uuid_bytes, payload)
+    return build_h264_sei_udu(uuid_bytes, payload)
+
+
+SEI_MODES = ("element", "probe")
+
+
+class SeiCache:
+    """SEI NAL(s) for the latest payload, rebuilt only when the payload object changes."""
+
+    def __init__(self, uuid_bytes: bytes, max_payload=0):
+        self.uuid_bytes = uuid_bytes
+        self.max_payload = max_payload  # split payloads above this (0 = never)
+        self._chunk_seq = 0
+        self._payload = None
+        self._sei = b""
+
+    def get(self, codec: str, payload: bytes) -> bytes:
+        if payload is not self._payload:
+            if not payload:
+                sei = b""
+            elif self.max_payload and len(payload) > self.max_payload:
+                self._chunk_seq = (self._chunk_seq + 1) & 0xFFFF
+                sei = build_chunked_sei(codec, payload, self.max_payload, self._chunk_seq)
+            else:
+                sei = build_sei_udu(codec, self.uuid_bytes, payload)
+            self._payload = payload
+            self._sei = sei
+        return self._sei
+
+
+# ============================================================
+# Timing helpers
+# ============================================================
+
+class RollingStats:
+    """Last `window` samples of some measurement, summarised on demand."""
+
+    def __init__(self, window=1000):
+        self._samples = collections.deque(maxlen=window)
+        self.count = 0
+
+    def add(self, value):
+        self._samples.append(value)
+        self.count += 1
+
+    def summary(self, scale=1.0) -> dict:
+        if not self._samples:
+            return {"n": self.count}
+        arr = np.asarray(self._samples, np.float64) * scale
+        p50, p99 = np.percentile(arr, [50, 99])
+        return {
+            "n": self.count,
+            "mean": round(float(arr.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(arr.max()), 3),
+        }
 
 
 # ============================================================
@@ -65,7 +197,7 @@ class SeiInjector(GstBase.BaseTransform):
     __gstmetadata__ = (
         "Python SEI Injector 4",
         "Filter/Video",
-        "Inject YOLO JSON as H.264 SEI (user_data_unregistered)",
+        "Inject YOLO JSON as H.264/H.265 SEI (user_data_unregistered)",
         "you",
     )
 
@@ -74,13 +206,19 @@ class SeiInjector(GstBase.BaseTransform):
             "sink",
             Gst.PadDirection.SINK,
             Gst.PadPresence.ALWAYS,
-            Gst.Caps.from_string("video/x-h264,stream-format=byte-stream,alignment=au"),
+            Gst.Caps.from_string(
+                "video/x-h264,stream-format=byte-stream,alignment=au; "
+                "video/x-h265,stream-format=byte-stream,alignment=au"
+            ),
         ),
         Gst.PadTemplate.new(
             "src",
             Gst.PadDirection.SRC,
             Gst.PadPresence.ALWAYS,
-            Gst.Caps.from_string("video/x-h264,stream-format=byte-stream,alignment=au"),
+            Gst.Caps.from_string(
+                "video/x-h264,stream-format=byte-stream,alignment=au; "
+                "video/x-h265,stream-format=byte-stream,alignment=au"
+            ),
         ),
     )
 
@@ -95,10 +233,19 @@ class SeiInjector(GstBase.BaseTransform):
         "idr-only": (
             GObject.TYPE_BOOLEAN,
             "Inject only on IDR frames",
-            "If true, inject SEI only when an IDR is seen",
+            "If true, inject SEI only when an IDR (H.265: IRAP) is seen",
             True,
             GObject.ParamFlags.READWRITE,
         ),
+        "max-payload": (
+            GObject.TYPE_UINT,
+            "Max SEI payload",
+            "Split payloads larger than this many bytes over several SEI messages (0 = never)",
+            0,
+            GLib.MAXUINT,
+            0,
+            GObject.ParamFlags.READWRITE,
+        ),
     }
 
     def __init__(self):
@@ -108,30 +255,55 @@ class SeiInjector(GstBase.BaseTransform):
         self._uuid = uuid.UUID("6c4b8b04-43c3-41a2-93b7-3a7b70f7ef00")
         self._uuid_bytes = self._uuid.bytes
         self._idr_only = True
+        self._codec = "h264"  # updated from negotiated caps
         # this will be set from outside (server’s capture loop)
         self._latest_json = b"{}"
         self._inject_count = 0  # debug counter
+        self.transform_ns = RollingStats()  # per-AU cost, for comparing transports
+        # SEI bytes are built once per payload, reused until it changes
+        self._sei_cache = SeiCache(self._uuid_bytes)
+        self._pending_sei = b""  # snapshot taken in do_prepare_output_buffer
 
     # allow server to call: sei_element.set_latest_json(...)
     def set_latest_json(self, d: dict):
-        self._latest_json = json.dumps(d, separators=(",", ":")).encode("utf-8")
+        self._latest_json = encode_meta(d)
+
+    # or hand over an already-encoded payload (shared with the metadata track)
+    def set_latest_payload(self, payload: bytes):
+        self._latest_json = payload
 
     def do_get_property(self, prop):
         if prop.name == "uuid":
             return str(self._uuid)
         if prop.name == "idr-only":
             return self._idr_only
+        if prop.name == "max-payload":
+            return self._sei_cache.max_payload
         return None
 
     def do_set_property(self, prop, value):
         if prop.name == "uuid":
             self._uuid = uuid.UUID(value)
             self._uuid_bytes = self._uuid.bytes
+            self._sei_cache = SeiCache(self._uuid_bytes, self._sei_cache.max_payload)
         elif prop.name == "idr-only":
             self._idr_only = bool(value)
+        elif prop.name == "max-payload":
+            self._sei_cache.max_payload = int(value)
+
+    def do_set_caps(self, incaps, outcaps):
+        name = incaps.get_structure(0).get_name()
+        self._codec = "h265" if name == "video/x-h265" else "h264"
+        return True
+
+    def _is_keyframe_nal(self, first_byte: int) -> bool:
+        if self._codec == "h265":
+            # IRAP pictures: BLA/IDR/CRA (nal_unit_type 16..23)
+            return 16 <= (first_byte >> 1) & 0x3F <= 23
+        return first_byte & 0x1F == 5  # IDR slice
 
     def _is_idr(self, data: bytes) -> bool:
-        """Check if buffer contains an IDR slice (NAL type 5)"""
+        """Check if buffer contains an IDR slice (H.264 NAL 5 / H.265 IRAP)"""
         pos = 0
         while pos < len(data) - 4:
             # Look for start codes (both 3-byte and 4-byte)
@@ -139,16 +311,14 @@ class SeiInjector(GstBase.BaseTransform):
                 # 4-byte start code
                 nal_start = pos + 4
                 if nal_start < len(data):
-                    nal_type = data[nal_start] & 0x1F
-                    if nal_type == 5:  # IDR slice
+                    if self._is_keyframe_nal(data[nal_start]):
                         return True
                 pos = nal_start
             elif data[pos:pos+3] == b"\x00\x00\x01":
                 # 3-byte start code
                 nal_start = pos + 3
                 if nal_start < len(data):
-                    nal_type = data[nal_start] & 0x1F
-                    if nal_type == 5:  # IDR slice
+                    if self._is_keyframe_nal(data[nal_start]):
                         return True
                 pos = nal_start
             else:
@@ -156,23 +326,18 @@ class SeiInjector(GstBase.BaseTransform):
         return False
 
     def do_prepare_output_buffer(self, inbuf: Gst.Buffer):
-        """Pre-allocate output buffer with enough space for SEI + original data"""
-        ok, inmap = inbuf.map(Gst.MapFlags.READ)
-        if not ok:
-            return Gst.FlowReturn.ERROR, None
-        
-        original_size = len(inmap.data)
-        inbuf.unmap(inmap)
-        
-        # Estimate max SEI size (UUID + payload + overhead)
-        max_sei_size = 16 + len(self._latest_json) + 20
-        out_size = original_size + max_sei_size
+        """Pre-allocate output buffer with exactly enough space for SEI + original data"""
+        original_size = inbuf.get_size()
+        # snapshot: the capture thread may swap _latest_json before do_transform
+        self._pending_sei = self._sei_cache.get(self._codec, self._latest_json)
+        out_size = original_size + len(self._pending_sei)
         
         # Allocate new buffer
         outbuf = Gst.Buffer.new_allocate(None, out_size, None)
         return Gst.FlowReturn.OK, outbuf
 
     def do_transform(self, inbuf: Gst.Buffer, outbuf: Gst.Buffer):
+        t0 = time.perf_counter_ns()
         # map incoming h264
         ok, inmap = inbuf.map(Gst.MapFlags.READ)
         if not ok:
@@ -184,8 +349,8 @@ class SeiInjector(GstBase.BaseTransform):
         if self._idr_only:
             inject_now = self._is_idr(original)
 
-        if inject_now and self._latest_json:
-            sei = build_h264_sei_udu(self._uuid_bytes, self._latest_json)
+        sei = self._pending_sei
+        if inject_now and sei:
             combined = sei + original
             self._inject_count += 1
             if SeiInjector.verbose and self._inject_count % 30 == 1:  # Log every ~1 second at 30fps
@@ -221,160 +386,2703 @@ class SeiInjector(GstBase.BaseTransform):
         outbuf.offset_end = inbuf.offset_end
         outbuf.set_flags(inbuf.get_flags())
 
+        self.transform_ns.add(time.perf_counter_ns() - t0)
+        if SeiInjector.verbose and self.transform_ns.count % 300 == 0:
+            print(f"[SEI] per-AU transform µs: {self.transform_ns.summary(1e-3)}")
         return Gst.FlowReturn.OK
 
 
+# ============================================================
+# SEI injection from a pad probe (alternative to the element)
+# ============================================================
+
+def push_replacement(pad: Gst.Pad, data) -> Gst.FlowReturn:
+    """
+    Send `data` (a Gst.Buffer or Gst.BufferList) on from `pad` in place of
+    what a probe on that pad is looking at; the probe then returns DROP.
+
+    Under PyGObject a probed buffer always holds a second reference (its
+    Python wrapper), so it is never writable in place. Probes that modify
+    buffers work on buf.copy() instead, which shares the memories.
+    """
+    if pad.get_direction() == Gst.PadDirection.SINK:
+        return pad.chain_list(data) if isinstance(data, Gst.BufferList) else pad.chain(data)
+    return pad.push_list(data) if isinstance(data, Gst.BufferList) else pad.push(data)
+
+
+class SeiProbeInjector:
+    """
+    Same SEI as pyseiinjector4, added from a buffer probe on the parser's
+    sink pad instead of a Python BaseTransform in the data path: no vfunc
+    dispatch and no copy of the slice data. The SEI NAL(s) are inserted in
+    front of a copy of the AU (which shares its memories) as one extra
+    GstMemory, and the copy is sent on in place of the AU (push_replacement).
+    """
+
+    verbose = False
+
+    def __init__(self, codec="h264", uuid_str="6c4b8b04-43c3-41a2-93b7-3a7b70f7ef00",
+                 idr_only=False, max_payload=0):
+        self.codec = codec
+        self.idr_only = idr_only
+        self._sei_cache = SeiCache(uuid.UUID(uuid_str).bytes, max_payload)
+        self._latest = b""
+        self._forwarding = False  # our own push_replacement() passing the probe
+        self.injected = 0
+        self.skipped = 0
+        self.probe_ns = RollingStats()
+
+    def set_latest_json(self, d: dict):
+        self._latest = encode_meta(d)
+
+    def set_latest_payload(self, payload: bytes):
+        self._latest = payload
+
+    def attach(self, element: Gst.Element, pad_name="sink"):
+        element.get_static_pad(pad_name).add_probe(Gst.PadProbeType.BUFFER, self._on_probe)
+
+    def _on_probe(self, pad, info):
+        if self._forwarding:
+            return Gst.PadProbeReturn.OK
+        t0 = time.perf_counter_ns()
+        buf = info.get_buffer()
+        # the encoder flags every non-keyframe AU, no need to scan for IDR NALs
+        if self.idr_only and buf.has_flags(Gst.BufferFlags.DELTA_UNIT):
+            return Gst.PadProbeReturn.OK
+        sei = self._sei_cache.get(self.codec, self._latest)
+        if not sei:
+            return Gst.PadProbeReturn.OK
+        out = buf.copy()  # refs the slice memories, copies no data
+        if not out.is_writable():
+            self.skipped += 1
+            return Gst.PadProbeReturn.OK
+        out.insert_memory(0, Gst.Buffer.new_wrapped(sei).get_memory(0))
+        self.injected += 1
+        self.probe_ns.add(time.perf_counter_ns() - t0)
+        if SeiProbeInjector.verbose and self.probe_ns.count % 300 == 0:
+            print(f"[SEI probe] injected={self.injected} skipped={self.skipped} "
+                  f"per-AU probe µs: {self.probe_ns.summary(1e-3)}")
+        self._forwarding = True
+        try:
+            push_replacement(pad, out)
+        finally:
+            self._forwarding = False
+        return Gst.PadProbeReturn.DROP
+
+
+# ============================================================
+# RTP header-extension transport (alternative to SEI)
+# ============================================================
+
+HDREXT_ID = 1  # RFC 8285 two-byte header element id
+HDREXT_MAX_ELEMENT = 255  # two-byte form: up to 255 bytes per element
+# Header extensions sit in the first packet of an AU, which the payloader has
+# already filled up to its MTU: room for them is reserved by lowering pay0's
+# mtu, and payloads are cut to fit (see Rendition.hdrext_budget).
+RTP_MTU = 1400  # rtph26Xpay default
+HDREXT_DEFAULT_BUDGET = 256
+
+
+def hdrext_reserve(budget: int) -> int:
+    """Bytes of RTP header extension a `budget`-byte payload can take"""
+    elements = -(-budget // HDREXT_MAX_ELEMENT)
+    # 4-byte extension header + 2-byte element headers + data, padded to 32 bits
+    return 4 + (budget + 2 * elements + 3) // 4 * 4
+
+
+class HeaderExtInjector:
+    """
+    Put the latest metadata payload in an RTP header extension on the first
+    packet of every access unit, from a buffer probe on the payloader's src
+    pad. The elementary stream is left untouched (no SeiInjector needed).
+    That packet is sent on as a copy with the extension (push_replacement).
+
+    Payloads larger than one element are split over consecutive elements
+    with the same id; receivers concatenate them in order. Payloads over
+    `max_payload` (the room reserved in the packet) are not written.
+    """
+
+    verbose = False
+
+    def __init__(self, max_payload=HDREXT_DEFAULT_BUDGET):
+        self._latest = b""
+        self._frame_start = True  # next packet opens a new AU
+        self._forwarding = False  # our own push_replacement() passing the probe
+        self.max_payload = max_payload
+        self.written = 0
+        self.skipped = 0
+        self.oversize = 0
+        self.probe_ns = RollingStats()
+
+    def set_latest_payload(self, payload: bytes):
+        self._latest = payload
+
+    def attach(self, payloader: Gst.Element):
+        payloader.get_static_pad("src").add_probe(
+            Gst.PadProbeType.BUFFER | Gst.PadProbeType.BUFFER_LIST, self._on_probe
+        )
+
+    def _on_probe(self, pad, info):
+        if self._forwarding:
+            return Gst.PadProbeReturn.OK
+        if info.type & Gst.PadProbeType.BUFFER_LIST:
+            blist = info.get_buffer_list()
+            packets = [blist.get(i) for i in range(blist.length())]
+            out = [self._handle_packet(buf) for buf in packets]
+            if all(new is old for new, old in zip(out, packets)):
+                return Gst.PadProbeReturn.OK
+            replacement = Gst.BufferList.new_sized(len(out))
+            for buf in out:
+                replacement.insert(-1, buf)
+        else:
+            buf = info.get_buffer()
+            replacement = self._handle_packet(buf)
+            if replacement is buf:
+                return Gst.PadProbeReturn.OK
+        self._forwarding = True
+        try:
+            push_replacement(pad, replacement)
+        finally:
+            self._forwarding = False
+        return Gst.PadProbeReturn.DROP
+
+    def _handle_packet(self, buf: Gst.Buffer) -> Gst.Buffer:
+        """Return `buf`, or a copy of it carrying the header extension"""
+        t0 = time.perf_counter_ns()
+        first = self._frame_start
+        out = buf
+        if first and len(self._latest) > self.max_payload:
+            self.oversize += 1
+        elif first and self._latest:
+            out = buf.copy()  # shares the packet memory until it is mapped for writing
+        flags = Gst.MapFlags.READ | Gst.MapFlags.WRITE if out is not buf else Gst.MapFlags.READ
+        ok, rtp = GstRtp.RTPBuffer.map(out, flags)
+        if not ok:
+            self.skipped += 1
+            return buf
+        try:
+            if out is not buf:
+                payload = self._latest
+                for off in range(0, len(payload), HDREXT_MAX_ELEMENT):
+                    chunk = payload[off:off + HDREXT_MAX_ELEMENT]
+                    if not rtp.add_extension_twobytes_header(0, HDREXT_ID, chunk):
+                        self.skipped += 1
+                        out = buf
+                        break
+                else:
+                    self.written += 1
+            # marker bit = last packet of the AU
+            self._frame_start = rtp.get_marker()
+        finally:
+            rtp.unmap()
+        if first:
+            self.probe_ns.add(time.perf_counter_ns() - t0)
+            if HeaderExtInjector.verbose and self.probe_ns.count % 300 == 0:
+                print(f"[HDREXT] written={self.written} skipped={self.skipped} oversize={self.oversize} "
+                      f"per-AU probe µs: {self.probe_ns.summary(1e-3)}")
+        return out
+
+
 GObject.type_register(SeiInjector)
 Gst.Element.register(None, SeiInjector.GST_PLUGIN_NAME, 0, SeiInjector)
 
 # ============================================================
-# RTSP factory
+# YOLO pre/post-processing
 # ============================================================
 
-def now_ns():
-    return time.time_ns()
+class LetterboxPreprocessor:
+    """
+    Letterbox a BGR frame once into a model-sized RGB float tensor.
 
-class YoloRTSPFactory(GstRtspServer.RTSPMediaFactory):
-    def __init__(self, src_url: str, yolo_model):
-        super().__init__()
-        # OpenCV capture for any source
-        self.cap = cv2.VideoCapture(src_url, cv2.CAP_FFMPEG)
-        if not self.cap.isOpened():
-            raise RuntimeError(f"Cannot open input: {src_url}")
+    Handing ultralytics a ready (1, 3, imgsz, imgsz) tensor skips its own
+    letterbox + BGR->RGB pass. Every buffer is allocated once and reused;
+    they are only rebuilt when the input frame shape changes.
+    """
 
-        self.yolo = yolo_model
-        self.frame_id = 0
-        self.duration = 1 / 30 * Gst.SECOND
+    def __init__(self, imgsz=640, pad_value=114):
+        self.imgsz = int(imgsz)
+        self.pad_value = pad_value
+        self._canvas = np.full((self.imgsz, self.imgsz, 3), pad_value, np.uint8)
+        self._chw = np.empty((1, 3, self.imgsz, self.imgsz), np.float32)
+        # torch view over _chw (shares memory, no copy)
+        self.tensor = torch.from_numpy(self._chw)
+        self._src_shape = None
+        self._resized = None
+        self._inner = None
+        self.pad = (0, 0)
+        self.inner_size = (self.imgsz, self.imgsz)
 
-        # GStreamer pipeline with aggressive SEI preservation
-        # appsrc (BGR) -> convert -> I420 -> x264enc (no-info) -> pyseiinjector4 -> h264parse -> rtph264pay
-        self.launch_string = (
-            "appsrc name=src is-live=true block=true format=GST_FORMAT_TIME "
-            "caps=video/x-raw,format=BGR,width=1280,height=720,framerate=30/1 "
-            "! videoconvert ! video/x-raw,format=I420 "
-            "! x264enc tune=zerolatency speed-preset=ultrafast key-int-max=60 byte-stream=true "
-            "option-string=\"nal-hrd=cbr:force-cfr=1\" "
-            "! video/x-h264,stream-format=byte-stream,alignment=au "
-            f"! {SeiInjector.GST_PLUGIN_NAME} name=sei idr-only=false "
-            "! h264parse config-interval=-1 "
-            "! video/x-h264,stream-format=byte-stream,alignment=au "
-            "! rtph264pay name=pay0 pt=96 config-interval=-1 aggregate-mode=zero-latency"
+    def _configure(self, h: int, w: int):
+        gain = min(self.imgsz / h, self.imgsz / w)
+        nw, nh = int(round(w * gain)), int(round(h * gain))
+        px, py = (self.imgsz - nw) // 2, (self.imgsz - nh) // 2
+        self._canvas[:] = self.pad_value
+        self._resized = np.empty((nh, nw, 3), np.uint8)
+        self._inner = self._canvas[py:py + nh, px:px + nw]
+        self.pad = (px, py)
+        self.inner_size = (nw, nh)
+        self._src_shape = (h, w)
+
+    def __call__(self, frame: np.ndarray) -> torch.Tensor:
+        h, w = frame.shape[:2]
+        if (h, w) != self._src_shape:
+            self._configure(h, w)
+        cv2.resize(frame, self.inner_size, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        self._inner[...] = self._resized
+        # BGR HWC uint8 -> RGB CHW float32 [0, 1] in one pass
+        np.multiply(
+            self._canvas[:, :, ::-1].transpose(2, 0, 1),
+            np.float32(1.0 / 255.0),
+            out=self._chw[0],
+            casting="unsafe",
         )
-        self.sei_element = None
+        return self.tensor
 
-    def do_create_element(self, url):
-        return Gst.parse_launch(self.launch_string)
+    def scale_boxes(self, xyxy: np.ndarray, out_w: int, out_h: int) -> np.ndarray:
+        """Map letterboxed (imgsz x imgsz) boxes back to out_w x out_h pixels."""
+        px, py = self.pad
+        nw, nh = self.inner_size
+        xs, ys = xyxy[:, 0:4:2], xyxy[:, 1:4:2]  # views, edited in place
+        xs -= px
+        xs *= out_w / nw
+        ys -= py
+        ys *= out_h / nh
+        np.clip(xs, 0, out_w, out=xs)
+        np.clip(ys, 0, out_h, out=ys)
+        return xyxy
 
-    def do_configure(self, media):
-        pipeline = media.get_element()
-        appsrc = pipeline.get_child_by_name("src")
-        self.sei_element = pipeline.get_child_by_name("sei")
 
-        # need-data -> capture frame, run yolo, update sei, push frame
-        appsrc.connect("need-data", self.on_need_data)
+def results_to_array(results) -> np.ndarray:
+    """Flatten ultralytics results into an (N, 6) [x1, y1, x2, y2, conf, cls] array."""
+    rows = []
+    for r in results:
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        rows.append(boxes.data[:, :6].cpu().numpy().astype(np.float32, copy=False))
+    if not rows:
+        return np.zeros((0, 6), np.float32)
+    return np.concatenate(rows, axis=0)
 
-    def on_need_data(self, src, length):
-        ok, frame = self.cap.read()
-        if not ok:
-            # just drop if source stalls
+
+def detections_to_json(dets: np.ndarray, names: dict) -> list:
+    """Turn an (N, 6) detection array into the SEI `yolo` list."""
+    detections = []
+    for x1, y1, x2, y2, conf, cls in dets.tolist():
+        cls = int(cls)
+        detections.append(
+            {
+                "cls": cls,
+                "name": names.get(cls, str(cls)),
+                "conf": conf,
+                "xyxy": [x1, y1, x2, y2],
+            }
+        )
+    return detections
+
+
+def frame_meta(frame_id: int, ts_ns: int, dets: np.ndarray, names: dict, extra: dict) -> dict:
+    """One frame's metadata record, the same for every transport and the local socket."""
+    meta = {
+        "v": 1,
+        "ts_ns": ts_ns,
+        "tx_ns": time.time_ns(),  # handed to the encoder / socket; tx - ts = server-side time
+        "frame": frame_id,
+        "yolo": detections_to_json(dets, names),
+    }
+    meta.update(extra)
+    return meta
+
+
+def fit_meta_budget(meta: dict, budget: int) -> bytes:
+    """
+    Encode `meta`, dropping the lowest-confidence detections until it fits
+    in `budget` bytes. The number dropped is recorded as "trunc".
+    """
+    payload = encode_meta(meta)
+    dets = meta.get("yolo", [])
+    if len(payload) <= budget or not dets:
+        return payload
+    dets = sorted(dets, key=lambda d: d["conf"], reverse=True)
+    base = len(encode_meta(dict(meta, yolo=[], trunc=len(dets))))
+    per_det = (len(payload) - base) / len(dets)
+    keep = max(0, min(len(dets) - 1, int((budget - base) / per_det)))
+    while True:
+        payload = encode_meta(dict(meta, yolo=dets[:keep], trunc=len(dets) - keep))
+        if len(payload) <= budget or keep == 0:
+            return payload
+        keep -= 1
+
+
+# ============================================================
+# Static-scene inference cache
+# ============================================================
+
+class StaticSceneCache:
+    """
+    Skip YOLO while the scene hasn't meaningfully changed.
+
+    Every frame is reduced to a tiny grayscale thumbnail and compared
+    (mean absolute difference, 0..255) with the thumbnail of the last
+    frame that actually went through the model. Below `threshold` the
+    cached detections are reused, but never for more than `max_age` frames.
+    """
+
+    def __init__(self, threshold=2.0, max_age=30, thumb_size=(32, 18)):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.thumb_size = thumb_size
+        w, h = thumb_size
+        self._small = np.empty((h, w, 3), np.uint8)
+        self._gray = np.empty((h, w), np.uint8)
+        self._ref = np.empty((h, w), np.uint8)
+        self._has_ref = False
+        self.age = 0  # frames since the cached detections were inferred
+        self.last_diff = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._infer_ms = 0.0  # EWMA of real inference time, to estimate savings
+
+    def should_reuse(self, frame: np.ndarray) -> bool:
+        cv2.resize(frame, self.thumb_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if not self._has_ref or self.age >= self.max_age:
+            return False
+        self.last_diff = float(cv2.norm(self._gray, self._ref, cv2.NORM_L1)) / self._gray.size
+        return self.last_diff < self.threshold
+
+    def record_hit(self):
+        self.hits += 1
+        self.age += 1
+        self.saved_ms += self._infer_ms
+
+    def record_inference(self, elapsed_ms: float):
+        """The frame last passed to should_reuse() was inferred: make it the reference"""
+        self.misses += 1
+        self.age = 0
+        self._ref[...] = self._gray
+        self._has_ref = True
+        self._infer_ms = elapsed_ms if self._infer_ms == 0 else 0.9 * self._infer_ms + 0.1 * elapsed_ms
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+        }
+
+
+# ============================================================
+# Motion-gated ROI inference
+# ============================================================
+
+def merge_rects(rects: list, margin: int) -> list:
+    """Union rects (x0, y0, x1, y1) that overlap once grown by `margin`, until stable"""
+    rects = list(rects)
+    merged = True
+    while merged and len(rects) > 1:
+        merged = False
+        out = []
+        while rects:
+            x0, y0, x1, y1 = rects.pop()
+            i = 0
+            while i < len(rects):
+                a0, b0, a1, b1 = rects[i]
+                if a0 - margin <= x1 and x0 - margin <= a1 and b0 - margin <= y1 and y0 - margin <= b1:
+                    x0, y0, x1, y1 = min(x0, a0), min(y0, b0), max(x1, a1), max(y1, b1)
+                    rects.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            out.append((x0, y0, x1, y1))
+        rects = out
+    return rects
+
+
+class MotionRoiGate:
+    """
+    Run YOLO only where something moves.
+
+    MOG2 background subtraction on a small grayscale copy finds moving
+    blobs; they are merged into at most `max_rois` regions and the crops go
+    through the model as one batch. Detections outside every ROI are carried
+    over from the previous frame (parked cars don't vanish). Too much motion,
+    or every `refresh` frames, falls back to a full-frame pass.
+    """
+
+    def __init__(self, max_rois=4, full_frac=0.5, refresh=150, analysis_width=320,
+                 min_area=0.0005, pad=32, min_crop=96):
+        self.max_rois = max_rois
+        self.full_frac = full_frac
+        self.refresh = refresh
+        self.analysis_width = analysis_width
+        self.min_area = min_area  # fraction of the analysis frame
+        self.pad = pad
+        self.min_crop = min_crop
+        self._bg = cv2.createBackgroundSubtractorMOG2(history=300, varThreshold=25,
+                                                      detectShadows=False)
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._small = None
+        self._gray = None
+        self._since_full = refresh  # first frame is always full
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.idle_frames = 0
+        self.roi_area = RollingStats()  # fraction of the frame actually inferred
+
+    def find_rois(self, frame: np.ndarray):
+        """Return ROI rects in `frame` pixels, or None when full-frame is cheaper."""
+        h, w = frame.shape[:2]
+        scale = self.analysis_width / w
+        sw, sh = self.analysis_width, int(round(h * scale))
+        if self._small is None or self._small.shape[:2] != (sh, sw):
+            self._small = np.empty((sh, sw, 3), np.uint8)
+            self._gray = np.empty((sh, sw), np.uint8)
+        cv2.resize(frame, (sw, sh), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        mask = self._bg.apply(self._gray)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+        mask = cv2.dilate(mask, self._kernel, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_px = self.min_area * sw * sh
+        rects = []
+        for c in contours:
+            x, y, cw, ch = cv2.boundingRect(c)
+            if cw * ch >= min_px:
+                rects.append((x, y, x + cw, y + ch))
+        if not rects:
+            return []
+
+        # grow the merge margin until the ROI count fits
+        margin = 4
+        rects = merge_rects(rects, margin)
+        while len(rects) > self.max_rois:
+            margin *= 2
+            rects = merge_rects(rects, margin)
+
+        # back to frame pixels, padded and clamped, with a minimum crop size
+        inv = 1.0 / scale
+        out = []
+        area = 0
+        for x0, y0, x1, y1 in rects:
+            x0, y0 = int(x0 * inv) - self.pad, int(y0 * inv) - self.pad
+            x1, y1 = int(x1 * inv) + self.pad, int(y1 * inv) + self.pad
+            if x1 - x0 < self.min_crop:
+                cx = (x0 + x1) // 2
+                x0, x1 = cx - self.min_crop // 2, cx + self.min_crop // 2
+            if y1 - y0 < self.min_crop:
+                cy = (y0 + y1) // 2
+                y0, y1 = cy - self.min_crop // 2, cy + self.min_crop // 2
+            x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+            out.append((x0, y0, x1, y1))
+            area += (x1 - x0) * (y1 - y0)
+        if area > self.full_frac * w * h:
+            return None
+        return out
+
+    def infer(self, frame: np.ndarray, hub, extra: dict) -> np.ndarray:
+        rois = self.find_rois(frame)
+        self._since_full += 1
+        if rois is None or self._since_full >= self.refresh:
+            self._since_full = 0
+            self.full_frames += 1
+            self.roi_area.add(1.0)
+            extra["roi"] = -1  # full frame
+            return hub.run_yolo(frame)
+
+        extra["roi"] = len(rois)
+        prev = hub.dets
+        if not rois:
+            self.idle_frames += 1
+            self.roi_area.add(0.0)
+            return prev
+
+        self.roi_frames += 1
+        h, w = frame.shape[:2]
+        self.roi_area.add(sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rois) / (w * h))
+
+        # one batched call for every crop
+        results = hub.yolo([frame[y0:y1, x0:x1] for x0, y0, x1, y1 in rois])
+        parts = []
+        for (x0, y0, _x1, _y1), r in zip(rois, results):
+            d = results_to_array([r])
+            d[:, 0:4:2] += x0
+            d[:, 1:4:2] += y0
+            parts.append(d)
+
+        # keep previous detections whose centre lies outside every ROI
+        if len(prev):
+            cx = (prev[:, 0] + prev[:, 2]) * 0.5
+            cy = (prev[:, 1] + prev[:, 3]) * 0.5
+            inside = np.zeros(len(prev), bool)
+            for x0, y0, x1, y1 in rois:
+                inside |= (cx >= x0) & (cx < x1) & (cy >= y0) & (cy < y1)
+            parts.append(prev[~inside])
+        return np.concatenate(parts, axis=0) if parts else np.zeros((0, 6), np.float32)
+
+    def stats(self) -> dict:
+        return {
+            "full": self.full_frames,
+            "roi": self.roi_frames,
+            "idle": self.idle_frames,
+            "area_frac": self.roi_area.summary(),
+        }
+
+
+# ============================================================
+# Tiled (sliced) inference for high-resolution sources
+# ============================================================
+
+def tile_starts(length: int, tile: int, overlap: int) -> list:
+    """Evenly spaced tile origins covering [0, length) with at least `overlap` px overlap"""
+    if tile >= length:
+        return [0]
+    n = int(np.ceil((length - overlap) / (tile - overlap)))
+    return [int(round(v)) for v in np.linspace(0, length - tile, n)]
+
+
+def fast_nms(dets: np.ndarray, thresh=0.5) -> np.ndarray:
+    """
+    Class-aware, fully vectorized NMS over an (N, 6) array.
+
+    Overlap is intersection over the *smaller* box, so a box cut off at a
+    tile border is still suppressed by the complete one from a
+    neighbouring tile. As in "Fast NMS", a box is dropped if any
+    higher-scoring box of its class overlaps it by more than `thresh`.
+    """
+    if len(dets) < 2:
+        return dets
+    dets = dets[np.argsort(-dets[:, 4])]
+    x1, y1, x2, y2 = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3]
+    area = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    iw = (np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :])).clip(0)
+    ih = (np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :])).clip(0)
+    ios = iw * ih / np.maximum(np.minimum(area[:, None], area[None, :]), 1e-6)
+    same_cls = dets[:, 5][:, None] == dets[:, 5][None, :]
+    # only higher-scoring boxes (earlier rows) may suppress
+    ios = np.triu(np.where(same_cls, ios, 0.0), k=1)
+    return dets[ios.max(axis=0) <= thresh]
+
+
+class TiledInference:
+    """
+    Split the native-resolution frame into overlapping tiles, run them as
+    one batch (split across `workers` model instances on CPU), map boxes to
+    hub coordinates and merge them with fast_nms.
+
+    With a per-frame `budget_ms`, a frame that runs over moves to the next
+    coarser level (1.5x bigger tiles = fewer of them); the last level is a
+    plain full-frame pass. Frames well under budget step back down again.
+    """
+
+    def __init__(self, tile=640, overlap=0.2, budget_ms=0.0, workers=1, model_path=None,
+                 nms_thresh=0.5):
+        self.tile = tile
+        self.overlap = overlap
+        self.budget_ms = budget_ms
+        self.nms_thresh = nms_thresh
+        self.level = 0
+        self._under_budget = 0
+        self._models = []
+        self._pool = None
+        if workers > 1 and model_path:
+            # ultralytics predictors aren't thread-safe: one model per worker
+            self._models = [YOLO(model_path) for _ in range(workers)]
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.tiles = RollingStats()
+        self.tile_ms = RollingStats()
+        self.level_changes = 0
+
+    def _grid(self, w: int, h: int):
+        size = int(self.tile * (1.5 ** self.level))
+        if size >= max(w, h):
+            return None  # coarsest level: full frame
+        ov = int(size * self.overlap)
+        return [
+            (x, y, min(x + size, w), min(y + size, h))
+            for y in tile_starts(h, size, ov)
+            for x in tile_starts(w, size, ov)
+        ]
+
+    def _run_batches(self, hub, crops: list) -> list:
+        if self._pool is None:
+            return list(hub.yolo(crops))
+        n = len(self._models)
+        batches = [crops[i::n] for i in range(n)]
+        futures = [
+            self._pool.submit(model, batch)
+            for model, batch in zip(self._models, batches) if batch
+        ]
+        per_worker = [list(f.result()) for f in futures]
+        # undo the round-robin split so results line up with crops
+        out = [None] * len(crops)
+        for i, results in enumerate(per_worker):
+            out[i::n] = results
+        return out
+
+    def infer(self, native: np.ndarray, hub, extra: dict) -> np.ndarray:
+        h, w = native.shape[:2]
+        grid = self._grid(w, h)
+        t0 = time.perf_counter()
+        if grid is None:
+            extra["tiles"] = 1
+            dets = hub.run_yolo(cv2.resize(native, (hub.width, hub.height)))
+        else:
+            extra["tiles"] = len(grid)
+            results = self._run_batches(hub, [native[y0:y1, x0:x1] for x0, y0, x1, y1 in grid])
+            parts = []
+            for (x0, y0, _x1, _y1), r in zip(grid, results):
+                d = results_to_array([r])
+                d[:, 0:4:2] += x0
+                d[:, 1:4:2] += y0
+                parts.append(d)
+            dets = np.concatenate(parts, axis=0) if parts else np.zeros((0, 6), np.float32)
+            dets = fast_nms(dets, self.nms_thresh)
+            # native -> hub pixels
+            dets[:, 0:4:2] *= hub.width / w
+            dets[:, 1:4:2] *= hub.height / h
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.tiles.add(extra["tiles"])
+        self.tile_ms.add(elapsed_ms)
+        self._adapt(elapsed_ms, grid is None)
+        return dets
+
+    def _adapt(self, elapsed_ms: float, at_coarsest: bool):
+        if self.budget_ms <= 0:
             return
-        frame = cv2.resize(frame, (1280, 720))
-
-        # run YOLO on original frame
-        results = self.yolo(frame)
-
-        detections = []
-        for r in results:
-            names = r.names
-            for b in r.boxes:
-                cls = int(b.cls[0])
-                conf = float(b.conf[0])
-                xyxy = b.xyxy[0].tolist()
-                detections.append(
-                    {
-                        "cls": cls,
-                        "name": names.get(cls, str(cls)),
-                        "conf": conf,
-                        "xyxy": xyxy,
-                    }
-                )
+        if elapsed_ms > self.budget_ms and not at_coarsest:
+            self.level += 1
+            self._under_budget = 0
+            self.level_changes += 1
+        elif elapsed_ms < 0.6 * self.budget_ms and self.level > 0:
+            self._under_budget += 1
+            if self._under_budget >= 30:
+                self.level -= 1
+                self._under_budget = 0
+                self.level_changes += 1
+        else:
+            self._under_budget = 0
 
-        # build metadata for this frame
-        meta = {
-            "v": 1,
-            "ts_ns": now_ns(),
-            "frame": self.frame_id,
-            "yolo": detections,
+    def stats(self) -> dict:
+        return {
+            "level": self.level,
+            "level_changes": self.level_changes,
+            "tiles": self.tiles.summary(),
+            "ms": self.tile_ms.summary(),
         }
 
-        # update SEI element so next encoded h264 buffer gets this JSON
-        if self.sei_element is not None:
-            self.sei_element.set_latest_json(meta)
 
-        # push ORIGINAL frame
-        data = frame.tobytes()
-        buf = Gst.Buffer.new_allocate(None, len(data), None)
-        buf.fill(0, data)
-        ts = self.frame_id * self.duration
-        buf.pts = buf.dts = int(ts)
-        buf.duration = self.duration
-        buf.offset = ts
-        self.frame_id += 1
+# ============================================================
+# Out-of-process inference (shared-memory frame ring)
+# ============================================================
 
-        # make sure caps are set
-        caps = Gst.Caps.from_string(
-            "video/x-raw,format=BGR,width=1280,height=720,framerate=30/1"
+def yolo_detect(yolo, preprocessor, frame: np.ndarray, width: int, height: int,
+                imgsz: int = None) -> np.ndarray:
+    """Run YOLO on `frame`, returning (N, 6) boxes in width x height pixels."""
+    if preprocessor is None:
+        return results_to_array(yolo(frame, imgsz=imgsz) if imgsz else yolo(frame))
+    dets = results_to_array(yolo(preprocessor(frame)))
+    preprocessor.scale_boxes(dets, width, height)
+    return dets
+
+
+def _inference_worker(shm_name, slots, width, height, model_path, imgsz, preprocess,
+                      tasks, results):
+    """Worker process: YOLO on the ring slots named in `tasks`, boxes back on `results`."""
+    # Ctrl-C goes to the whole process group; the parent shuts us down via `tasks`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((slots, height, width, 3), np.uint8, buffer=shm.buf)
+    try:
+        yolo = YOLO(model_path)
+        preprocessor = LetterboxPreprocessor(imgsz) if preprocess == "letterbox" else None
+        results.put(("ready", os.getpid(), dict(yolo.names)))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, frame_id = task
+            t0 = time.perf_counter()
+            try:
+                dets = yolo_detect(yolo, preprocessor, ring[slot], width, height, imgsz)
+            except Exception as e:
+                # one bad frame: hand the slot back without boxes, keep serving
+                results.put(("failed", frame_id, slot, repr(e), 0.0))
+                continue
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            results.put(("dets", frame_id, slot, dets.astype(np.float32).tobytes(), elapsed_ms))
+    except Exception as e:
+        results.put(("error", os.getpid(), repr(e)))
+    finally:
+        # views into shm.buf must be gone before close()
+        del ring
+        shm.close()
+
+
+class InferenceWorkers:
+    """
+    YOLO in separate processes, so ultralytics pre/post-processing never
+    competes for the GIL with the GStreamer streaming threads (need-data,
+    SeiInjector.do_transform).
+
+    Frames are copied once into a preallocated shared-memory ring of
+    (H, W, 3) BGR slots. Only (slot, frame_id) goes to a worker and only
+    (frame_id, slot, float32 boxes) comes back.
+    """
+
+    def __init__(self, model_path: str, count=1, width=1280, height=720, imgsz=640,
+                 preprocess="letterbox", slots=0, start_timeout=120.0):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.slots = slots or 2 * count
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * height * width * 3)
+        self.ring = np.ndarray((self.slots, height, width, 3), np.uint8, buffer=self._shm.buf)
+        self.ts_ns = [0] * self.slots
+        self._free = collections.deque(range(self.slots))
+        self.in_flight = 0
+        self._pending = {}  # slot -> frame id handed to a worker
+        self.late = 0  # results overtaken by a newer frame from another worker
+        self.failed = 0  # frames a worker couldn't infer (published without boxes)
+        self.lost = 0  # in-flight frames given up on after a worker died
+        self.names = {}
+
+        # spawn, not fork: the parent already has GStreamer and torch threads
+        ctx = multiprocessing.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_inference_worker,
+                args=(self._shm.name, self.slots, width, height, model_path, imgsz, preprocess,
+                      self._tasks, self._results),
+                daemon=True,
+            )
+            for _ in range(count)
+        ]
+        try:
+            for proc in self._procs:
+                proc.start()
+            for _ in range(count):
+                msg = self._recv(start_timeout)
+                if msg is None:
+                    raise RuntimeError("inference workers did not start in time")
+                if msg[0] == "error":
+                    raise RuntimeError(f"inference worker {msg[1]} failed: {msg[2]}")
+                self.names = msg[2]
+        except BaseException:
+            # a worker error, timeout or Ctrl-C: don't leak the ring or the other workers
+            self.close()
+            raise
+        print(f"✅ {count} inference worker(s) ready, {self.slots}-slot shared-memory ring")
+
+    def _recv(self, timeout: float):
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def submit(self, frame: np.ndarray, ts_ns: int, frame_id: int) -> bool:
+        """Copy `frame` into a free slot and queue it. False if the ring is full."""
+        if not self._free:
+            return False
+        slot = self._free.popleft()
+        np.copyto(self.ring[slot], frame)
+        self.ts_ns[slot] = ts_ns
+        self._pending[slot] = frame_id
+        self._tasks.put((slot, frame_id))
+        self.in_flight += 1
+        return True
+
+    def next_result(self, timeout=5.0):
+        """
+        (frame_id, slot, dets, infer_ms) for the next finished frame, None on
+        timeout. Never raises: a dead worker's frames are written off instead.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self._recv(max(deadline - time.monotonic(), 0.0))
+            if msg is None:
+                self._reap()
+                return None
+            if msg[0] == "error":
+                print(f"❌ inference worker {msg[1]} failed: {msg[2]}")
+                self._reap()
+                continue
+            kind, frame_id, slot, data, elapsed_ms = msg
+            if self._pending.get(slot) != frame_id:
+                continue  # written off by _reap; the slot was already handed back
+            del self._pending[slot]
+            self.in_flight -= 1
+            if kind == "failed":
+                self.failed += 1
+                print(f"⚠️  inference failed on frame {frame_id}: {data}")
+                return frame_id, slot, np.zeros((0, 6), np.float32), elapsed_ms
+            return frame_id, slot, np.frombuffer(data, np.float32).reshape(-1, 6).copy(), elapsed_ms
+
+    def _reap(self):
+        """Drop dead workers; their in-flight frames can't be told apart, so write all off"""
+        dead = [proc for proc in self._procs if proc.pid is not None and not proc.is_alive()]
+        if not dead:
+            return
+        for proc in dead:
+            self._procs.remove(proc)
+        self.count = len(self._procs)
+        print(f"❌ {len(dead)} inference worker(s) exited, {self.count} left")
+        # results still on their way for these slots are ignored (see _pending)
+        self.lost += len(self._pending)
+        self._free.extend(self._pending)
+        self._pending.clear()
+        self.in_flight = 0
+
+    def release(self, slot: int):
+        self._free.append(slot)
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for proc in self._procs:
+            if proc.pid is None:
+                continue  # never started
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        del self.ring
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self) -> dict:
+        return {"count": self.count, "slots": self.slots, "late": self.late,
+                "failed": self.failed, "lost": self.lost}
+
+
+# ============================================================
+# Latency-SLO quality controller
+# ============================================================
+
+class QualityController:
+    """
+    Keep per-frame inference cost under `budget_ms` by walking a ladder of
+    (model, imgsz, stride) levels, best first: every imgsz of the first
+    model, then of the next (cheaper) one, then detection strides 2..max on
+    the cheapest setting. Cost per frame = inference ms / stride.
+
+    An EWMA over the level's inferred frames drives it: over budget steps
+    down after `cooldown` frames. Under `up_frac` of the budget for
+    `up_after` frames steps back up. A step up that gets reverted right
+    away doubles the wait before trying that level again.
+
+    Models are loaded once up front; switching is a reference swap.
+    """
+
+    def __init__(self, models: list, imgsizes: list, budget_ms: float, max_stride=1,
+                 preprocess="letterbox", alpha=0.2, cooldown=15, up_after=90, up_frac=0.6):
+        self.models = models  # [(name, YOLO), ...], best first
+        self.budget_ms = budget_ms
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.up_after = up_after
+        self.up_frac = up_frac
+        self.levels = [(m, sz, 1) for m in range(len(models)) for sz in imgsizes]
+        self.levels += [(len(models) - 1, imgsizes[-1], k) for k in range(2, max_stride + 1)]
+        self.preprocessors = (
+            {sz: LetterboxPreprocessor(sz) for sz in imgsizes} if preprocess == "letterbox" else None
         )
-        src.set_caps(caps)
-        src.emit("push-buffer", buf)
+        self.level = 0
+        self.ewma_ms = None
+        self.quality = {}
+        self.changes = collections.deque(maxlen=20)
+        self.change_count = 0
+        self._inferred = 0  # on this level
+        self._under = 0
+        self._frame = 0
+        self.stride = 1  # set per level by apply()
+        self._failed_up = collections.Counter()  # level -> reverted step-ups
+        self._entered_up = None
+
+    def apply(self, hub):
+        """Point the hub at this level's model / input size"""
+        m, sz, stride = self.levels[self.level]
+        name, hub.yolo = self.models[m]
+        if self.preprocessors is not None:
+            hub.preprocessor = self.preprocessors[sz]
+        hub.model_imgsz = sz
+        self.stride = stride
+        self.quality = {"level": self.level, "model": name, "imgsz": sz, "stride": stride}
+
+    def skip_frame(self) -> bool:
+        """True on frames the current stride skips (last detections are reused)"""
+        self._frame += 1
+        return self._frame % self.stride != 0
+
+    def update(self, hub, elapsed_ms: float):
+        cost = elapsed_ms / self.stride
+        self.ewma_ms = cost if self.ewma_ms is None else self.ewma_ms + self.alpha * (cost - self.ewma_ms)
+        self._inferred += 1
+        if self._inferred < self.cooldown:
+            return
+        if self.ewma_ms > self.budget_ms and self.level < len(self.levels) - 1:
+            if self._entered_up == self.level and self._inferred < 2 * self.up_after:
+                # the step up didn't hold: back off before trying it again
+                self._failed_up[self.level] += 1
+            self._change(hub, self.level + 1, "over")
+        elif self.ewma_ms < self.up_frac * self.budget_ms and self.level > 0:
+            self._under += 1
+            if self._under >= self.up_after << min(self._failed_up[self.level - 1], 5):
+                self._change(hub, self.level - 1, "under")
+                self._entered_up = self.level
+        else:
+            self._under = 0
+
+    def _change(self, hub, level: int, reason: str):
+        old = self.quality
+        ewma = round(self.ewma_ms, 2)
+        self.level = level
+        self.apply(hub)
+        self.ewma_ms = None
+        self._inferred = 0
+        self._under = 0
+        self._frame = 0
+        if reason == "over":
+            self._entered_up = None
+        self.change_count += 1
+        change = {"frame": hub.frame_id, "reason": reason, "ewma_ms": ewma,
+                  "from": old, "to": dict(self.quality)}
+        self.changes.append(change)
+        print(f"[slo] {reason} budget {self.budget_ms} ms (ewma {ewma} ms): "
+              f"{old.get('model')}@{old.get('imgsz')}/{old.get('stride')} -> "
+              f"{self.quality['model']}@{self.quality['imgsz']}/{self.quality['stride']}")
+
+    def stats(self) -> dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "ewma_ms": self.ewma_ms and round(self.ewma_ms, 2),
+            "active": self.quality,
+            "levels": len(self.levels),
+            "changes": self.change_count,
+            "recent": list(self.changes)[-5:],
+        }
 
 
 # ============================================================
-# RTSP server wrapper
+# GPS / NMEA telemetry
 # ============================================================
 
-class YoloRTSPServer(GstRtspServer.RTSPServer):
-    def __init__(self, factory, port=8554, mount="/stream"):
-        super().__init__()
-        factory.set_shared(True)
-        self.set_service(str(port))
-        self.get_mount_points().add_factory(mount, factory)
-        self.attach(None)
-        print(f"✅ RTSP server running at rtsp://127.0.0.1:{port}{mount}")
+GpsFix = collections.namedtuple("GpsFix", "recv_ns nmea_time lat lon alt speed course")
+KNOTS_TO_MPS = 0.514444
 
 
-def main():
-    parser = argparse.ArgumentParser(description="YOLO → SEI → single RTSP stream")
-    parser.add_argument("--input", required=True, help="input source (v4l, http, rtsp, udp)")
-    parser.add_argument("--model", default="yolov8n.pt", help="YOLO model")
-    parser.add_argument(
-        "--output",
-        default="rtsp://127.0.0.1:8554/stream",
-        help="RTSP output URL (rtsp://host:port/path)",
-    )
-    parser.add_argument(
-        "--verbose", 
-        action="store_true", 
-        help="Enable verbose SEI injection logging (default: quiet)"
-    )
-    args = parser.parse_args()
-    
-    # Set verbose logging for SEI injector
-    SeiInjector.verbose = args.verbose
+class GpsReader:
+    """
+    Background GPS reader; frames look up a position without ever touching I/O.
 
-    print("Loading YOLO model...")
-    yolo = YOLO(args.model)
-    print(f"✅ YOLO model loaded: {args.model}")
+    Sources (`spec`):
+      serial:/dev/ttyUSB0[:baud]   NMEA over a serial port (pyserial + pynmea2)
+      gpsd[:host[:port]]           gpsd JSON (gps3)
+      replay:track.nmea[:speed]    NMEA log replayed at its own pace, looped
 
-    # parse output
-    # rtsp://127.0.0.1:8554/stream
-    parts = args.output.split("/")
-    host_port = parts[2]  # 127.0.0.1:8554
+    Only the reader thread writes, and it publishes the last two fixes as
+    one tuple swap, so readers need no lock. `at(ts_ns)` interpolates
+    between those fixes, or extrapolates up to `max_extrapolate` seconds
+    past the newest one, to a frame's capture time.
+    """
+
+    def __init__(self, spec: str, stale=5.0, max_extrapolate=1.0):
+        self.spec = spec
+        self.kind, _, self.arg = spec.partition(":")
+        if self.kind not in ("serial", "gpsd", "replay"):
+            raise ValueError(f"Unknown GPS source '{spec}' (serial:DEV, gpsd[:HOST[:PORT]], replay:FILE)")
+        self.stale_ns = int(stale * 1e9)
+        self.max_extrapolate_ns = int(max_extrapolate * 1e9)
+        self._fixes = (None, None)  # (previous, latest), swapped as a whole
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="gps", daemon=True)
+        self.sentences = 0
+        self.fixes = 0
+        self.errors = 0
+        self.stale_frames = 0
+        self._pushed = 0  # fixes and same-epoch merges
+
+    def start(self):
+        self._thread.start()
+        print(f"🛰  GPS reader: {self.spec}")
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- reader thread ----
+    def _run(self):
+        read = {"serial": self._read_serial, "gpsd": self._read_gpsd, "replay": self._read_replay}[self.kind]
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                read()
+                backoff = 1.0
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  GPS {self.spec}: {e}; retrying in {backoff:.0f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _read_serial(self):
+        import serial
+        dev, _, baud = self.arg.partition(":")
+        with serial.Serial(dev, int(baud or 4800), timeout=1.0) as port:
+            while not self._stop.is_set():
+                line = port.readline()
+                if line:
+                    self.feed_nmea(line.decode("ascii", errors="ignore"))
+
+    def _read_gpsd(self):
+        from gps3 import gps3
+        host, _, port = self.arg.partition(":")
+        sock = gps3.GPSDSocket()
+        stream = gps3.DataStream()
+        sock.connect(host or "127.0.0.1", int(port or 2947))
+        sock.watch()
+        try:
+            for data in sock:
+                if self._stop.is_set():
+                    break
+                if not data:
+                    continue
+                stream.unpack(data)
+                tpv = stream.TPV
+                if tpv.get("lat") in (None, "n/a") or tpv.get("lon") in (None, "n/a"):
+                    continue
+                num = lambda v: None if v in (None, "n/a") else float(v)
+                self._push_fix(tpv.get("time"), float(tpv["lat"]), float(tpv["lon"]),
+                               num(tpv.get("alt")), num(tpv.get("speed")), num(tpv.get("track")))
+        finally:
+            sock.close()
+
+    def _read_replay(self):
+        import pynmea2
+        path, _, speed = self.arg.partition(":")
+        speed = float(speed or 1.0)
+        while not self._stop.is_set():
+            pushed = self._pushed
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                base = None
+                start = time.monotonic()
+                for line in f:
+                    if self._stop.is_set():
+                        return
+                    try:
+                        msg = pynmea2.parse(line.strip())
+                    except pynmea2.ParseError:
+                        self.errors += 1
+                        continue
+                    ts = getattr(msg, "timestamp", None)
+                    if ts is not None:
+                        secs = ts.hour * 3600 + ts.minute * 60 + ts.second + ts.microsecond / 1e6
+                        base = secs if base is None else base
+                        # pace by the log's own clock (wraps at midnight)
+                        delay = start + ((secs - base) % 86400) / speed - time.monotonic()
+                        if delay > 0 and self._stop.wait(delay):
+                            return
+                    self._handle_nmea(msg)
+            if self._pushed == pushed:
+                # nothing usable in the file: let _run back off instead of spinning
+                raise RuntimeError(f"no GPS fixes in {path}")
+            # one NMEA epoch between the end of the log and its start
+            if self._stop.wait(1.0 / speed):
+                return
+
+    # ---- parsing ----
+    def feed_nmea(self, line: str):
+        import pynmea2
+        try:
+            msg = pynmea2.parse(line.strip())
+        except pynmea2.ParseError:
+            self.errors += 1
+            return
+        self._handle_nmea(msg)
+
+    def _handle_nmea(self, msg):
+        self.sentences += 1
+        kind = getattr(msg, "sentence_type", "")
+        if kind == "GGA":
+            if not msg.gps_qual or int(msg.gps_qual) == 0:
+                return  # no fix
+            alt = float(msg.altitude) if msg.altitude is not None else None
+            self._push_fix(msg.timestamp, msg.latitude, msg.longitude, alt=alt)
+        elif kind == "RMC":
+            if msg.status != "A":
+                return  # void
+            speed = float(msg.spd_over_grnd) * KNOTS_TO_MPS if msg.spd_over_grnd is not None else None
+            course = float(msg.true_course) if msg.true_course is not None else None
+            self._push_fix(msg.timestamp, msg.latitude, msg.longitude, speed=speed, course=course)
+
+    def _push_fix(self, nmea_time, lat, lon, alt=None, speed=None, course=None):
+        self._pushed += 1
+        prev, last = self._fixes
+        if last is not None:
+            # fill fields this sentence type doesn't carry from the latest fix
+            alt = last.alt if alt is None else alt
+            speed = last.speed if speed is None else speed
+            course = last.course if course is None else course
+        if last is not None and nmea_time is not None and nmea_time == last.nmea_time:
+            # GGA + RMC of the same epoch: one fix
+            self._fixes = (prev, last._replace(lat=lat, lon=lon, alt=alt, speed=speed, course=course))
+            return
+        fix = GpsFix(time.time_ns(), nmea_time, lat, lon, alt, speed, course)
+        self._fixes = (last, fix)
+        self.fixes += 1
+
+    # ---- frame side (no I/O, no lock) ----
+    def at(self, ts_ns: int):
+        """[lat, lon, alt_m, speed_mps, course_deg, age_ms] at `ts_ns`, None without a recent fix"""
+        prev, last = self._fixes
+        if last is None:
+            return None
+        age = ts_ns - last.recv_ns
+        if age > self.stale_ns:
+            self.stale_frames += 1
+            return None
+        lat, lon = last.lat, last.lon
+        if prev is not None and last.recv_ns > prev.recv_ns:
+            span = last.recv_ns - prev.recv_ns
+            f = (ts_ns - prev.recv_ns) / span
+            f = min(max(f, 0.0), 1.0 + self.max_extrapolate_ns / span)
+            lat = prev.lat + f * (last.lat - prev.lat)
+            lon = prev.lon + f * (last.lon - prev.lon)
+        rnd = lambda v, n: None if v is None else round(v, n)
+        return [round(lat, 7), round(lon, 7), rnd(last.alt, 1), rnd(last.speed, 2),
+                rnd(last.course, 1), max(int(age / 1e6), 0)]
+
+    def stats(self) -> dict:
+        _, last = self._fixes
+        return {
+            "sentences": self.sentences,
+            "fixes": self.fixes,
+            "errors": self.errors,
+            "stale_frames": self.stale_frames,
+            "last_age_ms": None if last is None else int((time.time_ns() - last.recv_ns) / 1e6),
+        }
+
+
+# ============================================================
+# Live source supervision
+# ============================================================
+
+class SourceSupervisor:
+    """
+    Owns the cv2.VideoCapture and reads it on its own thread, one frame ahead
+    of the hub, so decoding overlaps with inference.
+
+    `read()` waits at most `stall_timeout` for the next frame (then one frame
+    interval per call while stalled) and returns None instead of hanging the
+    appsrc; the hub repeats its last frame in that case. A failed read closes
+    the capture and reopens it in the background with exponential backoff;
+    frames resume as soon as the source is back. Files loop on EOF the same way.
+    """
+
+    def __init__(self, src_url: str, stall_timeout=0.5, max_backoff=10.0, read_timeout=5.0):
+        self.src_url = src_url
+        self.stall_timeout = stall_timeout
+        self.max_backoff = max_backoff
+        self.read_timeout_ms = int(read_timeout * 1000)
+        self.cap = self._open()
+        if self.cap is None:
+            raise RuntimeError(f"Cannot open input: {src_url}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_interval = 1.0 / fps if 1.0 <= fps <= 240.0 else 1 / 30
+        self._q = queue.Queue(maxsize=1)  # read-ahead of one (native, ts_ns)
+        self._stop = threading.Event()
+
+        self.stalled_since = None  # monotonic time of the first missed frame
+        self.stalls = 0
+        self.stall_ms = RollingStats()
+        self.stalled_total_s = 0.0
+        self.repeated = 0
+        self.read_errors = 0
+        self.reopens = 0
+        self.reopen_failures = 0
+
+        # last: _run uses the counters above from its first read on
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        # bounded open/read so a hung network source fails instead of blocking forever
+        cap = cv2.VideoCapture(self.src_url, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.read_timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.read_timeout_ms,
+        ])
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _run(self):
+        backoff = 0.0
+        while not self._stop.is_set():
+            if self.cap is None:
+                if backoff and self._stop.wait(backoff):
+                    break
+                self.cap = self._open()
+                if self.cap is None:
+                    self.reopen_failures += 1
+                    backoff = min(max(backoff * 2, 0.5), self.max_backoff)
+                    continue
+                self.reopens += 1
+                print(f"🔌 Source reopened: {self.src_url}")
+            ok, native = self.cap.read()
+            if not ok:
+                self.read_errors += 1
+                print(f"⚠️  Source read failed, reopening: {self.src_url}")
+                self.cap.release()
+                self.cap = None
+                continue
+            backoff = 0.0
+            item = (native, now_ns())
+            while not self._stop.is_set():
+                try:
+                    self._q.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        if self.cap is not None:
+            self.cap.release()
+
+    def poll(self, timeout: float):
+        """Next frame if one arrives within `timeout`; a miss doesn't count as a stall"""
+        try:
+            return self._resumed(self._q.get(timeout=timeout))
+        except queue.Empty:
+            return None
+
+    def read(self):
+        """(native frame, capture ts_ns), or None while the source is stalled"""
+        timeout = self.frame_interval if self.stalled_since is not None else self.stall_timeout
+        try:
+            item = self._q.get(timeout=timeout)
+        except queue.Empty:
+            if self.stalled_since is None:
+                # the frame we waited `stall_timeout` for counts as missed too
+                self.stalled_since = time.monotonic() - self.stall_timeout
+                self.stalls += 1
+                print(f"⏸  Source stalled: {self.src_url}")
+            self.repeated += 1
+            return None
+        return self._resumed(item)
+
+    def _resumed(self, item):
+        if self.stalled_since is not None:
+            stalled = time.monotonic() - self.stalled_since
+            self.stall_ms.add(stalled * 1000)
+            self.stalled_total_s += stalled
+            self.stalled_since = None
+            print(f"▶️  Source resumed after {stalled:.1f}s")
+        return item
+
+    def stall_age_ms(self) -> int:
+        if self.stalled_since is None:
+            return 0
+        return int((time.monotonic() - self.stalled_since) * 1000)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+
+    def stats(self) -> dict:
+        return {
+            "stalled": self.stalled_since is not None,
+            "stalls": self.stalls,
+            "stall_ms": self.stall_ms.summary(),
+            "stalled_total_s": round(self.stalled_total_s + self.stall_age_ms() / 1000, 1),
+            "repeated_frames": self.repeated,
+            "read_errors": self.read_errors,
+            "reopens": self.reopens,
+            "reopen_failures": self.reopen_failures,
+        }
+
+
+# ============================================================
+# Shared capture + inference
+# ============================================================
+
+def now_ns():
+    return time.time_ns()
+
+
+class FrameHub:
+    """
+    One capture and one YOLO pass shared by every rendition.
+
+    Each rendition's appsrc asks for "a frame newer than the last one I saw".
+    The first rendition to ask captures + infers; the others reuse that
+    result, so adding renditions costs one resize/encode each, not one model
+    run each. Boxes are kept in the hub's (reference) resolution.
+
+    With `workers`, YOLO runs in other processes: the hub keeps one frame per
+    worker in flight and publishes each frame once its boxes come back.
+
+    When the source stalls (or worker results are overdue) the hub keeps the
+    cadence by republishing its last frame and boxes, marked
+    `"stale": <ms since the last real frame>`; a black frame stands in until
+    the first one arrives. `get()` therefore always has a frame to give.
+    """
+
+    def __init__(self, src_url: str, yolo_model, width=1280, height=720,
+                 imgsz=640, preprocess="letterbox", scene_cache: StaticSceneCache = None,
+                 roi_gate: MotionRoiGate = None, tiler: TiledInference = None,
+                 workers: InferenceWorkers = None, slo: QualityController = None,
+                 gps: GpsReader = None, stall_timeout=0.5, max_backoff=10.0):
+        # OpenCV capture for any source, read and reopened on its own thread
+        self.source = SourceSupervisor(src_url, stall_timeout, max_backoff)
+
+        self.yolo = yolo_model
+        self.names = getattr(yolo_model, "names", None) or (workers.names if workers else {})
+        self.width = width
+        self.height = height
+        # "letterbox": build the model input once here (see LetterboxPreprocessor)
+        # "ultralytics": hand the BGR frame over and let ultralytics do it
+        self.preprocessor = LetterboxPreprocessor(imgsz) if preprocess == "letterbox" else None
+        # ultralytics preprocessing: --imgsz, or whatever the SLO controller picks
+        self.model_imgsz = imgsz
+        self.scene_cache = scene_cache
+        self.roi_gate = roi_gate
+        self.tiler = tiler
+        self.workers = workers
+        self.slo = slo
+        self.gps = gps
+        if slo is not None:
+            slo.apply(self)
+        self.infer_ms = RollingStats()
+        self._captured = -1
+        # worker results carry capture ids; hub ids also count repeated frames
+        self._published_capture = -1
+        self._results_overdue = False
+        self._last_real = time.monotonic()
+
+        self._lock = threading.Lock()
+        self.frame_id = -1
+        self.frame = None
+        self.dets = np.zeros((0, 6), np.float32)
+        self.ts_ns = 0
+        # extra per-frame SEI fields (e.g. "cached": age of reused detections)
+        self.extra = {}
+
+    def run_yolo(self, frame: np.ndarray) -> np.ndarray:
+        """Run YOLO on `frame`, returning (N, 6) boxes in hub-resolution pixels."""
+        return yolo_detect(self.yolo, self.preprocessor, frame, self.width, self.height,
+                           self.model_imgsz)
+
+    def _advance_pooled(self) -> bool:
+        workers = self.workers
+        while True:
+            # keep every worker busy: later frames are inferred while this one is published
+            while workers.in_flight < workers.count:
+                # with results pending, don't sit out a stall timeout before collecting them
+                got = self.source.poll(self.source.frame_interval) if workers.in_flight else self.source.read()
+                if got is None:
+                    break
+                native, ts_ns = got
+                self._captured += 1
+                frame = cv2.resize(native, (self.width, self.height))
+                if not workers.submit(frame, ts_ns, self._captured):
+                    break
+            if not workers.in_flight:
+                return self._repeat_last()
+            # like a source stall: wait stall_timeout once, then repeat at the frame rate
+            got = workers.next_result(self.source.frame_interval if self._results_overdue
+                                      else self.source.stall_timeout)
+            if got is None:
+                if not self._results_overdue:
+                    print("⏸  Inference results overdue, repeating the last frame")
+                self._results_overdue = True
+                return self._repeat_last()
+            self._results_overdue = False
+            capture_id, slot, dets, elapsed_ms = got
+            if capture_id > self._published_capture:
+                break
+            workers.release(slot)
+            workers.late += 1
+        # copy out: feeders read self.frame outside the lock, the slot gets reused
+        self.frame = workers.ring[slot].copy()
+        self.ts_ns = workers.ts_ns[slot]
+        workers.release(slot)
+        self.dets = dets
+        self.infer_ms.add(elapsed_ms)
+        self.extra = {}
+        self._add_gps(self.extra)
+        self._published_capture = capture_id
+        self._last_real = time.monotonic()
+        self.frame_id += 1
+        return True
+
+    def _add_gps(self, extra: dict):
+        if self.gps is not None:
+            fix = self.gps.at(self.ts_ns)
+            if fix is not None:
+                extra["gps"] = fix
+
+    def _repeat_last(self) -> bool:
+        """No new frame in time: republish the last frame and boxes, marked stale"""
+        if self.frame is None:
+            # nothing captured yet: a black frame keeps every appsrc fed
+            self.frame = np.zeros((self.height, self.width, 3), np.uint8)
+        self.ts_ns = now_ns()
+        self.extra = {"stale": max(int((time.monotonic() - self._last_real) * 1000), 1)}
+        self._add_gps(self.extra)
+        self.frame_id += 1
+        return True
+
+    def _advance(self) -> bool:
+        if self.workers is not None:
+            return self._advance_pooled()
+        got = self.source.read()
+        if got is None:
+            return self._repeat_last()
+        native, self.ts_ns = got
+        frame = cv2.resize(native, (self.width, self.height))
+        extra = {}
+        cache = self.scene_cache
+        if cache is not None and cache.should_reuse(frame):
+            # static scene: keep self.dets from the last inferred frame
+            cache.record_hit()
+            extra["cached"] = cache.age
+        elif self.slo is not None and self.slo.skip_frame():
+            pass  # SLO stride: keep self.dets from the last inferred frame
+        else:
+            t0 = time.perf_counter()
+            if self.roi_gate is not None:
+                self.dets = self.roi_gate.infer(frame, self, extra)
+            elif self.tiler is not None:
+                # tiles are cut from the native capture, not the downscaled frame
+                self.dets = self.tiler.infer(native, self, extra)
+            else:
+                self.dets = self.run_yolo(frame)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            self.infer_ms.add(elapsed_ms)
+            if cache is not None:
+                cache.record_inference(elapsed_ms)
+            if self.slo is not None:
+                self.slo.update(self, elapsed_ms)
+        if self.slo is not None:
+            # quality level the consumer is looking at
+            extra["q"] = self.slo.quality
+        self._add_gps(extra)
+        self.extra = extra
+        self.frame = frame
+        self._last_real = time.monotonic()
+        self.frame_id += 1
+        return True
+
+    def get(self, last_seen: int):
+        """
+        Return (frame_id, frame, dets, ts_ns, extra) for a frame newer than
+        `last_seen`, capturing one if nobody has yet. A stalled source or
+        overdue inference yields a repeated frame marked "stale", not None.
+        """
+        with self._lock:
+            if self.frame_id <= last_seen and not self._advance():
+                return None
+            return self.frame_id, self.frame, self.dets, self.ts_ns, self.extra
+
+    def stats(self) -> dict:
+        out = {"frame": self.frame_id, "infer_ms": self.infer_ms.summary(),
+               "source": self.source.stats()}
+        if self.scene_cache is not None:
+            out["scene_cache"] = self.scene_cache.stats()
+        if self.roi_gate is not None:
+            out["motion_roi"] = self.roi_gate.stats()
+        if self.tiler is not None:
+            out["tiled"] = self.tiler.stats()
+        if self.workers is not None:
+            out["workers"] = self.workers.stats()
+        if self.slo is not None:
+            out["slo"] = self.slo.stats()
+        if self.gps is not None:
+            out["gps"] = self.gps.stats()
+        return out
+
+
+# ============================================================
+# Renditions
+# ============================================================
+
+TRANSPORTS = ("sei", "hdrext")
+BUDGET_POLICIES = ("split", "topk")
+
+
+class EncoderProfile:
+    """
+    Named encoder settings for the encode chain. `threads` / `sliced_threads`
+    apply to x264enc and openh264enc (as multi-thread / slices); x265enc
+    only takes preset, tune, GOP and bitrate. A rendition's own bitrate
+    overrides the profile's.
+    """
+
+    def __init__(self, name, encoder="x264", preset="ultrafast", tune="zerolatency", gop=60,
+                 bitrate=0, threads=0, sliced_threads=None, description=""):
+        self.name = name
+        self.encoder = encoder  # "x264" (x265 for h265) or "openh264" (h264 only)
+        self.preset = preset
+        self.tune = tune
+        self.gop = gop
+        self.bitrate = bitrate  # kbit/s, 0 = encoder default
+        self.threads = threads  # 0 = encoder default (auto)
+        self.sliced_threads = sliced_threads  # None = encoder default
+        self.description = description
+
+    def supports(self, codec: str) -> bool:
+        return codec == "h264" or self.encoder == "x264"
+
+    def element(self, codec="h264", bitrate=0) -> str:
+        """Encoder element (named "enc") for the launch string"""
+        bitrate = bitrate or self.bitrate
+        if self.encoder == "openh264":
+            slices = "slice-mode=auto " if self.sliced_threads else ""
+            return (
+                f"openh264enc name=enc usage-type=camera complexity=low rate-control=bitrate "
+                f"bitrate={(bitrate or 2000) * 1000} gop-size={self.gop} multi-thread={self.threads} "
+                f"{slices}"
+            )
+        rate = f"bitrate={bitrate} " if bitrate else ""
+        tune = f"tune={self.tune} " if self.tune else ""
+        if codec == "h265":
+            return f"x265enc name=enc {tune}speed-preset={self.preset} key-int-max={self.gop} {rate}"
+        threads = f"threads={self.threads} " if self.threads else ""
+        if self.sliced_threads is not None:
+            threads += f"sliced-threads={str(self.sliced_threads).lower()} "
+        return (
+            f"x264enc name=enc {tune}speed-preset={self.preset} key-int-max={self.gop} "
+            f"{rate}{threads}byte-stream=true option-string=\"nal-hrd=cbr:force-cfr=1\" "
+        )
+
+    def __repr__(self):
+        return f"{self.name}: {self.element().strip()}"
+
+
+ENCODER_PROFILES = {p.name: p for p in (
+    EncoderProfile("lowlat", description="ultrafast + zerolatency, auto sliced threads (default)"),
+    EncoderProfile("lowcpu", threads=2, gop=120, bitrate=1500,
+                   description="two threads and a long GOP: least CPU for many streams per box"),
+    EncoderProfile("quality", preset="veryfast", bitrate=4000,
+                   description="better compression per bit for more CPU"),
+    EncoderProfile("throughput", tune=None, sliced_threads=False,
+                   description="frame threads instead of slices: more fps per core, "
+                               "adds about one frame of latency per thread"),
+    EncoderProfile("openh264", encoder="openh264", threads=2, sliced_threads=True, bitrate=2000,
+                   description="Cisco openh264enc, for builds without x264"),
+)}
+DEFAULT_ENCODER_PROFILE = "lowlat"
+
+
+class Rendition:
+    """One published encoding of the shared stream: mount, size, bitrate, codec."""
+
+    def __init__(self, mount="/stream", width=1280, height=720, bitrate=0, codec="h264",
+                 metadata_track=False, transport="sei", meta_budget=0, budget_policy="split",
+                 sei_mode="element", encoder=DEFAULT_ENCODER_PROFILE):
+        self.mount = mount if mount.startswith("/") else "/" + mount
+        self.width = int(width)
+        self.height = int(height)
+        self.bitrate = int(bitrate)  # kbit/s, 0 = encoder default
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' (expected one of {CODECS})")
+        self.codec = codec
+        # expose detections as their own RTP stream (pay1) next to the video
+        self.metadata_track = bool(metadata_track)
+        # in-video metadata: "sei" (SeiInjector) or "hdrext" (RTP header extension)
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport '{transport}' (expected one of {TRANSPORTS})")
+        self.transport = transport
+        # per-frame metadata byte budget: "split" over several SEI messages,
+        # or "topk" = drop the lowest-confidence detections until it fits
+        if budget_policy not in BUDGET_POLICIES:
+            raise ValueError(f"Unknown budget policy '{budget_policy}' (expected one of {BUDGET_POLICIES})")
+        self.meta_budget = int(meta_budget)
+        self.budget_policy = budget_policy
+        # SEI via the pyseiinjector4 element or a probe on the parser's sink pad
+        if sei_mode not in SEI_MODES:
+            raise ValueError(f"Unknown SEI mode '{sei_mode}' (expected one of {SEI_MODES})")
+        self.sei_mode = sei_mode
+        # named encoder settings (ENCODER_PROFILES)
+        if encoder not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile '{encoder}' (expected one of {tuple(ENCODER_PROFILES)})")
+        if not ENCODER_PROFILES[encoder].supports(codec):
+            raise ValueError(f"Encoder profile '{encoder}' does not support {codec}")
+        self.encoder = encoder
+
+    @property
+    def split_budget(self) -> int:
+        return self.meta_budget if self.budget_policy == "split" else 0
+
+    @property
+    def hdrext_budget(self) -> int:
+        # header extensions can't be split over packets: the budget is a hard cap
+        if self.transport != "hdrext":
+            return 0
+        return self.meta_budget or HDREXT_DEFAULT_BUDGET
+
+    @classmethod
+    def parse(cls, spec: str, default_mount="/stream", default_codec="h264",
+              default_metadata_track=False, default_transport="sei", default_sei_mode="element",
+              default_encoder=DEFAULT_ENCODER_PROFILE):
+        """
+        Parse "mount=/low,size=640x360,bitrate=500,codec=h265,meta=1,transport=hdrext,sei=probe,enc=lowcpu"
+        (all keys optional).
+        """
+        kw = {"mount": default_mount, "codec": default_codec,
+              "metadata_track": default_metadata_track, "transport": default_transport,
+              "sei_mode": default_sei_mode, "encoder": default_encoder}
+        for item in filter(None, spec.split(",")):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key == "size":
+                w, _, h = value.lower().partition("x")
+                kw["width"], kw["height"] = int(w), int(h)
+            elif key in ("mount", "bitrate", "codec", "transport"):
+                kw[key] = value.strip()
+            elif key == "sei":
+                kw["sei_mode"] = value.strip()
+            elif key == "enc":
+                kw["encoder"] = value.strip()
+            elif key == "meta":
+                kw["metadata_track"] = value.strip().lower() in ("1", "true", "yes", "on")
+            else:
+                raise ValueError(f"Unknown rendition key '{key}' in '{spec}'")
+        return cls(**kw)
+
+    def __repr__(self):
+        rate = f"{self.bitrate} kbit/s" if self.bitrate else "default bitrate"
+        meta = " + metadata track" if self.metadata_track else ""
+        transport = "sei (probe)" if self.transport == "sei" and self.sei_mode == "probe" \
+            else self.transport
+        return (f"{self.mount} {self.codec} {self.width}x{self.height} @ {rate}, "
+                f"{transport}{meta}, encoder {self.encoder}")
+
+
+META_CAPS = "application/x-yolo-meta,encoding=json"
+
+
+def build_encode_chain(width: int, height: int, bitrate: int = 0, codec: str = "h264",
+                       transport: str = "sei", sei_max_payload: int = 0,
+                       sei_mode: str = "element", encoder: str = DEFAULT_ENCODER_PROFILE) -> str:
+    """
+    appsrc (BGR) -> convert -> I420 -> encoder profile (x264enc/x265enc/openh264enc) -> pyseiinjector4
+    transport="hdrext" drops pyseiinjector4 (metadata goes into RTP header extensions),
+    and so does sei_mode="probe" (SeiProbeInjector on the parser named "parse").
+    Ends on byte-stream/AU caps so callers can append a parser + sink.
+    """
+    sei = (
+        f"! {SeiInjector.GST_PLUGIN_NAME} name=sei idr-only=false max-payload={sei_max_payload} "
+        if transport == "sei" and sei_mode == "element" else ""
+    )
+    encoder = ENCODER_PROFILES[encoder].element(codec, bitrate)
+    return (
+        "appsrc name=src is-live=true block=true format=GST_FORMAT_TIME "
+        f"caps=video/x-raw,format=BGR,width={width},height={height},framerate=30/1 "
+        "! videoconvert ! video/x-raw,format=I420 "
+        f"! {encoder}"
+        f"! video/x-{codec},stream-format=byte-stream,alignment=au "
+        f"{sei}"
+    )
+
+
+def build_launch_string(width: int, height: int, bitrate: int = 0, codec: str = "h264",
+                        metadata_track: bool = False, transport: str = "sei",
+                        sei_max_payload: int = 0, sei_mode: str = "element",
+                        encoder: str = DEFAULT_ENCODER_PROFILE, hdrext_budget: int = 0) -> str:
+    """
+    GStreamer pipeline with aggressive SEI preservation
+    <encode chain> -> h26Xparse -> rtph26Xpay
+    Optional second stream: appsrc (JSON) -> rtpgstpay (pay1), same PTS as the video
+    With `hdrext_budget`, pay0's mtu leaves room for that much header extension.
+    """
+    mtu = f" mtu={RTP_MTU - hdrext_reserve(hdrext_budget)}" if hdrext_budget else ""
+    return (
+        build_encode_chain(width, height, bitrate, codec, transport, sei_max_payload, sei_mode,
+                           encoder)
+        + f"! {codec}parse name=parse config-interval=-1 "
+        f"! video/x-{codec},stream-format=byte-stream,alignment=au "
+        f"! rtp{codec}pay name=pay0 pt=96 config-interval=-1 aggregate-mode=zero-latency{mtu}"
+    ) + (
+        " appsrc name=metasrc is-live=true block=false format=GST_FORMAT_TIME "
+        f"caps={META_CAPS} "
+        "! rtpgstpay name=pay1 pt=97 config-interval=1"
+        if metadata_track else ""
+    )
+
+
+# ============================================================
+# appsrc feeding (shared by RTSP media and the recorder)
+# ============================================================
+
+class AppsrcFramePool:
+    """
+    Recycled GstBuffers for one appsrc. Frames are written straight into the
+    mapped buffer (cv2.resize into it, or one np.copyto), instead of
+    tobytes() + new_allocate() + fill(), which copied each frame twice into a
+    freshly allocated buffer. Buffers go back to the pool once the encoder
+    drops them.
+    """
+
+    def __init__(self, caps: Gst.Caps, width: int, height: int, min_buffers=4):
+        self.shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        self.pool = Gst.BufferPool.new()
+        config = self.pool.get_config()
+        Gst.BufferPool.config_set_params(config, caps, self.frame_bytes, min_buffers, 0)
+        self.active = self.pool.set_config(config) and self.pool.set_active(True)
+        self.frames = 0
+        self.pooled = 0  # buffers taken from the pool
+        self.allocated = 0  # buffers allocated outside it (pool inactive / failed)
+        self.copied_bytes = 0
+
+    def fill(self, frame: np.ndarray):
+        """GstBuffer holding `frame` (resized to the pool size if needed)"""
+        buf = None
+        if self.active:
+            ret, buf = self.pool.acquire_buffer(None)
+            if ret != Gst.FlowReturn.OK:
+                buf = None
+        if buf is None:
+            buf = Gst.Buffer.new_allocate(None, self.frame_bytes, None)
+            self.allocated += 1
+        else:
+            self.pooled += 1
+        ok, mapinfo = buf.map(Gst.MapFlags.WRITE)
+        if not ok:
+            # can't write in place: fall back to a fresh copy rather than no buffer
+            if frame.shape != self.shape:
+                frame = cv2.resize(frame, (self.shape[1], self.shape[0]))
+            self.frames += 1
+            return Gst.Buffer.new_wrapped(frame.tobytes())
+        dst = np.ndarray(self.shape, np.uint8, buffer=mapinfo.data)
+        if frame.shape == self.shape:
+            np.copyto(dst, frame)
+            self.copied_bytes += self.frame_bytes
+        else:
+            # resize output lands in the buffer, no copy afterwards
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=dst)
+        # the view must not outlive the mapping
+        del dst
+        buf.unmap(mapinfo)
+        self.frames += 1
+        return buf
+
+    def stats(self) -> dict:
+        return {
+            "pooled": self.pooled,
+            "allocated": self.allocated,
+            "copied_bytes_per_frame": round(self.copied_bytes / max(self.frames, 1)),
+        }
+
+
+class RenditionFeeder:
+    """
+    Pulls frames + detections from the hub for one rendition, hands the
+    encoded metadata to the in-video transport and pushes the frame into the
+    pipeline's appsrc.
+    """
+
+    def __init__(self, hub: FrameHub, rendition: Rendition):
+        self.hub = hub
+        self.rendition = rendition
+        self.width = rendition.width
+        self.height = rendition.height
+        # hub boxes -> this rendition's pixels
+        self.box_scale = np.array(
+            [self.width / hub.width, self.height / hub.height] * 2, np.float32
+        )
+        self.frame_id = 0  # this rendition's own output counter (drives PTS)
+        self.last_hub_frame = -1
+        self.duration = 1 / 30 * Gst.SECOND
+        # recent PTS -> hub frame id, for consumers downstream of the encoder
+        self.pts_frames = collections.OrderedDict()
+        self.sei_element = None
+        self.sei_probe = None
+        self.hdrext = None
+        self.payload_sinks = []
+        self.meta_src = None
+        # pacing at the appsrc: GIL stalls in the streaming thread show up here
+        self.push_interval_ms = RollingStats()
+        self._last_push = 0.0
+        self.caps = Gst.Caps.from_string(
+            f"video/x-raw,format=BGR,width={self.width},height={self.height},framerate=30/1"
+        )
+        self.frame_pool = None
+        # fast join: forced IDR + full metadata snapshot for new clients
+        self.encoder = None
+        self.min_keyframe_interval = 1.0  # s; 0 = never force
+        self.join_requests = 0
+        self.forced_keyframes = 0
+        self.join_idr_ms = RollingStats()  # PLAY request -> IDR out of the encoder
+        self._last_forced = float("-inf")
+        self._keyframe_pending = False
+        self._join_snapshot = False
+        self._joins_waiting = []  # PLAY request times, guarded by _join_lock
+        self._join_lock = threading.Lock()
+
+    def bind(self, pipeline: Gst.Bin):
+        appsrc = pipeline.get_child_by_name("src")
+        self.encoder = pipeline.get_child_by_name("enc")
+        self.sei_element = pipeline.get_child_by_name("sei")
+        self.meta_src = pipeline.get_child_by_name("metasrc")
+        self.payload_sinks = [self.sei_element] if self.sei_element is not None else []
+        if self.rendition.transport == "sei" and self.rendition.sei_mode == "probe":
+            self.sei_probe = SeiProbeInjector(self.rendition.codec,
+                                              max_payload=self.rendition.split_budget)
+            self.sei_probe.attach(pipeline.get_child_by_name("parse"))
+            self.payload_sinks.append(self.sei_probe)
+        if self.rendition.transport == "hdrext":
+            self.hdrext = HeaderExtInjector(self.rendition.hdrext_budget)
+            self.hdrext.attach(pipeline.get_child_by_name("pay0"))
+            self.payload_sinks.append(self.hdrext)
+
+        self.frame_pool = AppsrcFramePool(self.caps, self.width, self.height)
+
+        # need-data -> fetch shared frame + detections, update sei, push frame
+        appsrc.connect("need-data", self.on_need_data)
+
+    def frame_for_pts(self, pts: int) -> int:
+        return self.pts_frames.get(pts, -1)
+
+    def request_keyframe(self):
+        """
+        A client joined: ask the encoder for an IDR so it can start decoding
+        now rather than at the next scheduled keyframe. Requests closer
+        together than min_keyframe_interval are coalesced into one.
+        """
+        if self.encoder is None or self.min_keyframe_interval <= 0:
+            return
+        self.join_requests += 1
+        with self._join_lock:
+            if not self._joins_waiting:
+                self.encoder.get_static_pad("src").add_probe(
+                    Gst.PadProbeType.BUFFER, self._on_enc_output
+                )
+            self._joins_waiting.append(time.perf_counter_ns())
+        wait = self._last_forced + self.min_keyframe_interval - time.monotonic()
+        if wait <= 0:
+            self._force_keyframe()
+        elif not self._keyframe_pending:
+            self._keyframe_pending = True
+            GLib.timeout_add(int(wait * 1000) + 1, self._force_keyframe)
+
+    def _force_keyframe(self):
+        self._keyframe_pending = False
+        self._last_forced = time.monotonic()
+        event = GstVideo.video_event_new_upstream_force_key_unit(
+            Gst.CLOCK_TIME_NONE, True, self.forced_keyframes
+        )
+        self.encoder.get_static_pad("src").send_event(event)
+        self.forced_keyframes += 1
+        # next frame's metadata goes out whole, whatever the budget policy
+        self._join_snapshot = True
+        return False  # one-shot GLib timeout
+
+    def _on_enc_output(self, pad, info):
+        if info.get_buffer().has_flags(Gst.BufferFlags.DELTA_UNIT):
+            return Gst.PadProbeReturn.OK
+        now = time.perf_counter_ns()
+        with self._join_lock:
+            for t0 in self._joins_waiting:
+                self.join_idr_ms.add((now - t0) / 1e6)
+            self._joins_waiting = []
+        return Gst.PadProbeReturn.REMOVE
+
+    def on_need_data(self, src, length):
+        # every need-data must be answered with a buffer: appsrc doesn't ask twice
+        hub_frame_id, frame, dets, ts_ns, extra = self.hub.get(self.last_hub_frame)
+        self.last_hub_frame = hub_frame_id
+
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            # the frame itself is resized straight into the appsrc buffer below
+            dets = dets.copy()
+            dets[:, :4] *= self.box_scale
+
+        # build metadata for this frame (hub frame id is shared by all renditions)
+        meta = frame_meta(hub_frame_id, ts_ns, dets, self.hub.names, extra)
+        snapshot = self._join_snapshot
+        if snapshot:
+            meta["join"] = 1
+            self._join_snapshot = False
+
+        if self.rendition.budget_policy == "topk" and self.rendition.meta_budget and not snapshot:
+            payload = fit_meta_budget(meta, self.rendition.meta_budget)
+        else:
+            payload = encode_meta(meta)
+
+        # header extensions only get the room reserved in pay0's mtu: always top-k
+        hdrext_payload = payload
+        if self.hdrext is not None and len(payload) > self.rendition.hdrext_budget:
+            hdrext_payload = fit_meta_budget(meta, self.rendition.hdrext_budget)
+
+        # update SEI element / header-ext probe so the next encoded AU gets this JSON
+        for sink in self.payload_sinks:
+            sink.set_latest_payload(hdrext_payload if sink is self.hdrext else payload)
+
+        # push frame
+        buf = self.frame_pool.fill(frame)
+        ts = self.frame_id * self.duration
+        buf.pts = buf.dts = int(ts)
+        buf.duration = self.duration
+        buf.offset = ts
+        self.frame_id += 1
+
+        self.pts_frames[buf.pts] = hub_frame_id
+        if len(self.pts_frames) > 256:
+            self.pts_frames.popitem(last=False)
+
+        # make sure caps are set
+        src.set_caps(self.caps)
+        now = time.perf_counter()
+        if self._last_push:
+            self.push_interval_ms.add((now - self._last_push) * 1000)
+        self._last_push = now
+        src.emit("push-buffer", buf)
+
+        # same payload on the metadata-only track, stamped with the video PTS
+        if self.meta_src is not None:
+            metabuf = Gst.Buffer.new_wrapped(payload)
+            metabuf.pts = metabuf.dts = int(ts)
+            metabuf.duration = self.duration
+            self.meta_src.emit("push-buffer", metabuf)
+
+    def stats(self) -> dict:
+        interval = self.push_interval_ms.summary()
+        out = {"interval_ms": interval}
+        if "p99" in interval:
+            # p99 frame-interval jitter vs the nominal 1/30 s
+            out["jitter_p99_ms"] = round(interval["p99"] - self.duration / Gst.MSECOND, 3)
+        # per-AU metadata injection cost, whichever path this rendition uses
+        if self.sei_element is not None:
+            out["inject_us"] = self.sei_element.transform_ns.summary(1e-3)
+        elif self.sei_probe is not None:
+            out["inject_us"] = self.sei_probe.probe_ns.summary(1e-3)
+            out["sei_probe_skipped"] = self.sei_probe.skipped
+        elif self.hdrext is not None:
+            out["inject_us"] = self.hdrext.probe_ns.summary(1e-3)
+            out["hdrext_oversize"] = self.hdrext.oversize
+            out["hdrext_skipped"] = self.hdrext.skipped
+        if self.frame_pool is not None:
+            out["appsrc"] = self.frame_pool.stats()
+        if self.join_requests:
+            out["join"] = {
+                "requests": self.join_requests,
+                "forced_idr": self.forced_keyframes,
+                "to_idr_ms": self.join_idr_ms.summary(),
+            }
+        return out
+
+
+# ============================================================
+# RTSP factory
+# ============================================================
+
+class YoloRTSPFactory(GstRtspServer.RTSPMediaFactory):
+    def __init__(self, hub: FrameHub, rendition: Rendition = None):
+        super().__init__()
+        self.hub = hub
+        self.rendition = rendition or Rendition(width=hub.width, height=hub.height)
+        self.width = self.rendition.width
+        self.height = self.rendition.height
+        self.feeder = RenditionFeeder(hub, self.rendition)
+
+        self.launch_string = build_launch_string(
+            self.width, self.height, self.rendition.bitrate, self.rendition.codec,
+            self.rendition.metadata_track, self.rendition.transport,
+            self.rendition.split_budget, self.rendition.sei_mode, self.rendition.encoder,
+            self.rendition.hdrext_budget,
+        )
+
+    def do_create_element(self, url):
+        return Gst.parse_launch(self.launch_string)
+
+    def do_configure(self, media):
+        self.feeder.bind(media.get_element())
+
+
+# ============================================================
+# Segmented recording with a frame -> offset sidecar index
+# ============================================================
+
+RECORD_FORMATS = ("h264", "mkv", "mp4")  # "h264" = raw Annex-B (.h264/.h265)
+INDEX_MAGIC = b"YIDX"
+INDEX_VERSION = 1
+# frame id, pts (ns), byte offset (-1 inside containers), AU size, flags
+INDEX_RECORD = struct.Struct("<qqqIB")
+INDEX_FLAG_KEYFRAME = 0x01
+
+
+class SegmentIndexWriter:
+    """
+    Sidecar `<segment>.idx`: 8-byte header (magic, version, record size)
+    followed by fixed-size INDEX_RECORD entries, one per AU.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(INDEX_MAGIC + struct.pack("<HH", INDEX_VERSION, INDEX_RECORD.size))
+
+    def add(self, frame_id: int, pts: int, offset: int, size: int, keyframe: bool):
+        flags = INDEX_FLAG_KEYFRAME if keyframe else 0
+        self._f.write(INDEX_RECORD.pack(frame_id, pts, offset, size, flags))
+
+    def close(self):
+        self._f.close()
+
+
+def read_segment_index(path: str):
+    """Yield (frame_id, pts, offset, size, is_keyframe) from a sidecar index"""
+    with open(path, "rb") as f:
+        header = f.read(8)
+        if header[:4] != INDEX_MAGIC:
+            raise ValueError(f"{path}: not a segment index")
+        _version, rec_size = struct.unpack("<HH", header[4:])
+        while True:
+            rec = f.read(rec_size)
+            if len(rec) < rec_size:
+                break
+            frame_id, pts, offset, size, flags = INDEX_RECORD.unpack(rec[:INDEX_RECORD.size])
+            yield frame_id, pts, offset, size, bool(flags & INDEX_FLAG_KEYFRAME)
+
+
+class SegmentRecorder:
+    """
+    Record the shared hub stream, SEI included, into time-segmented files.
+
+    RTSP media only exists while clients are connected, so the recorder
+    owns its own pipeline fed from the same hub (same frames, same
+    detections, no extra inference). Segments start on a keyframe once
+    `segment_seconds` have elapsed.
+
+    h264: raw Annex-B written from an appsink -> exact byte offsets in the index.
+    mkv/mp4: splitmuxsink; the index keeps PTS/keyframe with offset -1.
+    """
+
+    def __init__(self, hub: FrameHub, out_dir: str, fmt="h264", segment_seconds=60,
+                 codec="h264", bitrate=0, prefix="rec", meta_budget=0, budget_policy="split",
+                 sei_mode="element", encoder=DEFAULT_ENCODER_PROFILE):
+        if fmt not in RECORD_FORMATS:
+            raise ValueError(f"Unknown record format '{fmt}' (expected one of {RECORD_FORMATS})")
+        os.makedirs(out_dir, exist_ok=True)
+        self.fmt = fmt
+        self.codec = codec
+        self.segment_ns = int(segment_seconds * Gst.SECOND)
+        self.base = os.path.join(out_dir, f"{prefix}_{time.strftime('%Y%m%d-%H%M%S')}")
+        self.rendition = Rendition(mount="/record", width=hub.width, height=hub.height,
+                                   bitrate=bitrate, codec=codec, meta_budget=meta_budget,
+                                   budget_policy=budget_policy, sei_mode=sei_mode,
+                                   encoder=encoder)
+        self.feeder = RenditionFeeder(hub, self.rendition)
+
+        chain = build_encode_chain(hub.width, hub.height, bitrate, codec, "sei",
+                                   self.rendition.split_budget, sei_mode, encoder)
+        # identity sync=true paces the recorder at real time instead of racing the hub
+        if fmt == "h264":
+            tail = (
+                f"! {codec}parse name=parse config-interval=-1 "
+                f"! video/x-{codec},stream-format=byte-stream,alignment=au "
+                "! identity name=recidx sync=true "
+                "! appsink name=recsink emit-signals=true sync=false"
+            )
+        else:
+            muxer = "matroskamux" if fmt == "mkv" else "mp4mux"
+            tail = (
+                f"! {codec}parse name=parse config-interval=-1 "
+                "! identity name=recidx sync=true "
+                f"! splitmuxsink name=recmux muxer-factory={muxer} "
+                f"max-size-time={self.segment_ns} location={self.base}_%05d.{fmt}"
+            )
+        self.pipeline = Gst.parse_launch(chain + tail)
+        self.feeder.bind(self.pipeline)
+
+        # raw writer state
+        self._file = None
+        self._index = None
+        self._offset = 0
+        self._segment = -1
+        self._segment_start = 0
+        # container state: entries wait until their fragment is closed
+        self._pending = collections.deque()
+        self._location = None
+
+        if fmt == "h264":
+            self.pipeline.get_by_name("recsink").connect("new-sample", self._on_sample)
+        else:
+            self.pipeline.get_by_name("recidx").get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, self._on_container_buffer
+            )
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message", self._on_bus_msg)
+
+    def start(self):
+        self.pipeline.set_state(Gst.State.PLAYING)
+        print(f"⏺  Recording {self.fmt} segments to {self.base}_*")
+
+    def stop(self):
+        self.pipeline.send_event(Gst.Event.new_eos())
+        # main loop is gone: drain the final fragment-closed / EOS by hand
+        bus = self.pipeline.get_bus()
+        while True:
+            msg = bus.timed_pop_filtered(
+                5 * Gst.SECOND,
+                Gst.MessageType.EOS | Gst.MessageType.ERROR | Gst.MessageType.ELEMENT,
+            )
+            if msg is None or msg.type != Gst.MessageType.ELEMENT:
+                break
+            self._on_bus_msg(bus, msg)
+        self.pipeline.set_state(Gst.State.NULL)
+        self._close_raw_segment()
+        self._flush_pending(None)
+
+    # ---- raw Annex-B ----
+    def _open_raw_segment(self, pts: int):
+        self._close_raw_segment()
+        self._segment += 1
+        self._segment_start = pts
+        path = f"{self.base}_{self._segment:05d}.{self.codec}"
+        self._file = open(path, "wb")
+        self._index = SegmentIndexWriter(path + ".idx")
+        self._offset = 0
+
+    def _close_raw_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def _on_sample(self, sink):
+        sample = sink.emit("pull-sample")
+        if not sample:
+            return Gst.FlowReturn.OK
+        buf = sample.get_buffer()
+        keyframe = not buf.has_flags(Gst.BufferFlags.DELTA_UNIT)
+        if self._file is None and not keyframe:
+            return Gst.FlowReturn.OK  # every segment starts decodable
+        if self._file is None or (keyframe and buf.pts - self._segment_start >= self.segment_ns):
+            self._open_raw_segment(buf.pts)
+        ok, mapinfo = buf.map(Gst.MapFlags.READ)
+        if ok:
+            size = mapinfo.size
+            self._file.write(mapinfo.data)
+            buf.unmap(mapinfo)
+            self._index.add(self.feeder.frame_for_pts(buf.pts), buf.pts, self._offset, size, keyframe)
+            self._offset += size
+        return Gst.FlowReturn.OK
+
+    # ---- mkv / mp4 ----
+    def _on_container_buffer(self, pad, info):
+        buf = info.get_buffer()
+        keyframe = not buf.has_flags(Gst.BufferFlags.DELTA_UNIT)
+        self._pending.append(
+            (self.feeder.frame_for_pts(buf.pts), buf.pts, -1, buf.get_size(), keyframe)
+        )
+        return Gst.PadProbeReturn.OK
+
+    def _flush_pending(self, end_pts, location=None):
+        """Write pending entries up to `end_pts` (None = all) to `location`.idx"""
+        location = location or self._location
+        if location is None or not self._pending:
+            return
+        index = SegmentIndexWriter(location + ".idx")
+        while self._pending and (end_pts is None or self._pending[0][1] < end_pts):
+            index.add(*self._pending.popleft())
+        index.close()
+
+    def _on_bus_msg(self, bus, msg):
+        if msg.type == Gst.MessageType.ELEMENT:
+            st = msg.get_structure()
+            if st is not None and st.get_name() == "splitmuxsink-fragment-opened":
+                self._location = st.get_string("location")
+            elif st is not None and st.get_name() == "splitmuxsink-fragment-closed":
+                # recorder pipeline starts at running time 0, so running time == PTS
+                self._flush_pending(st.get_value("running-time"), st.get_string("location"))
+        elif msg.type == Gst.MessageType.ERROR:
+            err, dbg = msg.parse_error()
+            print(f"❌ Recorder error: {err} {dbg or ''}")
+
+
+# ============================================================
+# Local metadata fan-out (Unix domain socket)
+# ============================================================
+
+class MetaPublisher:
+    """
+    Publish every hub frame's metadata record (the SEI JSON, at hub
+    resolution) on a SOCK_SEQPACKET Unix socket, one message per frame.
+    Co-located consumers read detections without RTSP, depayload or SEI
+    parsing.
+
+    Sends are non-blocking: a subscriber whose socket buffer is full misses
+    that frame instead of stalling the others, and one that has missed
+    `max_drops` frames in a row is disconnected.
+
+    Pulls from the hub on its own thread at the stream rate, so it also runs
+    with no RTSP clients connected.
+    """
+
+    def __init__(self, hub: FrameHub, path: str, fps=30.0, max_drops=300, sndbuf=256 * 1024):
+        self.hub = hub
+        self.path = path
+        self.interval = 1.0 / fps
+        self.max_drops = max_drops
+        self.sndbuf = sndbuf
+        self._subs = {}  # socket -> consecutive drops
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self._server.bind(path)
+        self._server.listen(16)
+        self._threads = [
+            threading.Thread(target=self._accept_loop, name="meta-accept", daemon=True),
+            threading.Thread(target=self._publish_loop, name="meta-publish", daemon=True),
+        ]
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+        print(f"📡 Publishing metadata on unix:{self.path}")
+
+    def stop(self):
+        self._stop.set()
+        self._server.close()
+        with self._lock:
+            for sub in self._subs:
+                sub.close()
+            self._subs.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sub, _ = self._server.accept()
+            except OSError:
+                break  # closed in stop()
+            sub.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+            sub.setblocking(False)
+            with self._lock:
+                self._subs[sub] = 0
+
+    def _publish_loop(self):
+        last = -1
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            got = self.hub.get(last)
+            if got is not None:
+                frame_id, _frame, dets, ts_ns, extra = got
+                last = frame_id
+                self.publish(encode_meta(frame_meta(frame_id, ts_ns, dets, self.hub.names, extra)))
+            next_t += self.interval
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()
+
+    def publish(self, payload: bytes):
+        self.published += 1
+        # non-blocking sends only, so holding the lock here is cheap
+        with self._lock:
+            for sub, drops in list(self._subs.items()):
+                try:
+                    sub.send(payload)
+                    self.sent += 1
+                    self._subs[sub] = 0
+                    continue
+                except BlockingIOError:
+                    self.dropped += 1
+                    self._subs[sub] = drops + 1
+                    if drops < self.max_drops:
+                        continue
+                except OSError:
+                    pass  # subscriber went away
+                del self._subs[sub]
+                sub.close()
+                self.disconnected += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subs),
+            "published": self.published,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
+
+
+# ============================================================
+# RTSP server wrapper
+# ============================================================
+
+class YoloRTSPServer(GstRtspServer.RTSPServer):
+    def __init__(self, factory=None, port=8554, mount="/stream"):
+        super().__init__()
+        self.port = port
+        self.set_service(str(port))
+        self.factories = {}  # mount -> YoloRTSPFactory
+        if factory is not None:
+            self.add_factory(mount, factory)
+        self.connect("client-connected", self._on_client_connected)
+        self.attach(None)
+
+    def add_factory(self, mount, factory):
+        factory.set_shared(True)
+        self.get_mount_points().add_factory(mount, factory)
+        self.factories[mount] = factory
+        print(f"✅ RTSP server running at rtsp://127.0.0.1:{self.port}{mount}")
+
+    def _on_client_connected(self, server, client):
+        client.connect("play-request", self._on_play_request)
+
+    def _on_play_request(self, client, ctx):
+        # PLAY may target the aggregate URL or a stream control URL below it
+        path = ctx.uri.abspath if ctx.uri is not None else ""
+        mounts = [m for m in self.factories if path == m or path.startswith(m.rstrip("/") + "/")]
+        if mounts:
+            self.factories[max(mounts, key=len)].feeder.request_keyframe()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO → SEI → RTSP stream(s)")
+    parser.add_argument("--input", required=True, help="input source (v4l, http, rtsp, udp)")
+    parser.add_argument("--model", default="yolov8n.pt", help="YOLO model")
+    parser.add_argument("--imgsz", type=int, default=640, help="YOLO input size (square)")
+    parser.add_argument(
+        "--preprocess",
+        choices=["letterbox", "ultralytics"],
+        default="letterbox",
+        help="letterbox: build the model tensor once in the server (default); "
+             "ultralytics: pass the BGR frame and let ultralytics resize it",
+    )
+    parser.add_argument(
+        "--output",
+        default="rtsp://127.0.0.1:8554/stream",
+        help="RTSP output URL (rtsp://host:port/path)",
+    )
+    parser.add_argument(
+        "--codec",
+        choices=CODECS,
+        default="h264",
+        help="video codec for renditions that don't set codec= (h265 uses x265enc/rtph265pay)",
+    )
+    parser.add_argument(
+        "--encoder-profile",
+        choices=list(ENCODER_PROFILES),
+        default=DEFAULT_ENCODER_PROFILE,
+        help="encoder settings for renditions that don't set enc=: "
+             + "; ".join(f"{p.name}: {p.description}" for p in ENCODER_PROFILES.values())
+             + ". Compare them with utils/encoder_bench.py",
+    )
+    parser.add_argument(
+        "--rendition",
+        action="append",
+        default=[],
+        metavar="SPEC",
+        help="extra encoding sharing the same capture + inference, e.g. "
+             "'mount=/low,size=640x360,bitrate=500' (repeatable). "
+             "Without it a single 1280x720 stream is served at the --output path",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default="sei",
+        help="how per-frame metadata travels with the video: sei (default) or hdrext "
+             "(RTP header extension on each AU's first packet; per rendition: transport=)",
+    )
+    parser.add_argument(
+        "--sei-mode",
+        choices=SEI_MODES,
+        default="element",
+        help="element: pyseiinjector4 BaseTransform (default); probe: prepend the SEI from a "
+             "buffer probe on the parser's sink pad, no Python element in the data path "
+             "(per rendition: sei=)",
+    )
+    parser.add_argument(
+        "--metadata-track",
+        action="store_true",
+        help="also publish detections as a separate RTP stream (pay1) so clients can "
+             "SETUP metadata only; SEI in the video is kept (per rendition: meta=1)",
+    )
+    parser.add_argument(
+        "--meta-budget",
+        type=int,
+        default=0,
+        help="per-frame metadata budget in bytes (0 = unbounded); see --budget-policy. "
+             f"With --transport hdrext it is a hard cap (default {HDREXT_DEFAULT_BUDGET}) "
+             "that is reserved in every video packet",
+    )
+    parser.add_argument(
+        "--budget-policy",
+        choices=BUDGET_POLICIES,
+        default="split",
+        help="split: chunk oversized SEI payloads over several SEI messages (client reassembles); "
+             "topk: keep only the highest-confidence detections that fit",
+    )
+    parser.add_argument(
+        "--join-keyframe-interval",
+        type=float,
+        default=1.0,
+        help="force an IDR (+ full metadata snapshot) when a client starts playing, at most "
+             "once per this many seconds per rendition (0 = wait for the regular keyframe)",
+    )
+    parser.add_argument(
+        "--meta-socket",
+        metavar="PATH",
+        help="also publish each frame's metadata (SEI JSON) on this Unix SOCK_SEQPACKET socket "
+             "for local subscribers (see utils/meta_subscriber.py)",
+    )
+    parser.add_argument(
+        "--record-dir",
+        help="also record the stream (SEI intact) into time-segmented files in this directory, "
+             "each with a <file>.idx frame/PTS -> byte offset index",
+    )
+    parser.add_argument(
+        "--record-format",
+        choices=RECORD_FORMATS,
+        default="h264",
+        help="h264: raw Annex-B segments with exact byte offsets (default); mkv/mp4: splitmuxsink",
+    )
+    parser.add_argument("--segment-seconds", type=float, default=60.0, help="recording segment length")
+    parser.add_argument(
+        "--static-threshold",
+        type=float,
+        default=0.0,
+        help="skip YOLO and reuse the last detections while the mean abs diff of a 32x18 "
+             "gray thumbnail vs the last inferred frame stays below this (0..255; 0 = off)",
+    )
+    parser.add_argument(
+        "--static-max-age",
+        type=int,
+        default=30,
+        help="max consecutive frames that may reuse cached detections",
+    )
+    parser.add_argument(
+        "--motion-roi",
+        action="store_true",
+        help="run YOLO only on batched crops around moving regions (MOG2 background subtraction)",
+    )
+    parser.add_argument("--roi-max", type=int, default=4, help="max ROIs per frame")
+    parser.add_argument(
+        "--roi-full-frac",
+        type=float,
+        default=0.5,
+        help="fall back to full-frame inference when ROIs cover more than this fraction",
+    )
+    parser.add_argument(
+        "--roi-refresh",
+        type=int,
+        default=150,
+        help="force a full-frame pass every N frames",
+    )
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help="sliced inference on the native-resolution frame (small/distant objects)",
+    )
+    parser.add_argument("--tile-size", type=int, default=640, help="tile edge in native pixels")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="tile overlap fraction")
+    parser.add_argument(
+        "--tile-budget-ms",
+        type=float,
+        default=0.0,
+        help="per-frame time budget; over it, fall back to fewer/larger tiles (0 = off)",
+    )
+    parser.add_argument(
+        "--tile-workers",
+        type=int,
+        default=1,
+        help="parallel model instances for tiles (useful on CPU)",
+    )
+    parser.add_argument(
+        "--infer-workers",
+        type=int,
+        default=0,
+        help="run YOLO in N worker processes fed through a shared-memory frame ring "
+             "(0 = in-process; not combinable with --static-threshold/--motion-roi/--tiled)",
+    )
+    parser.add_argument(
+        "--slo-budget-ms",
+        type=float,
+        default=0.0,
+        help="per-frame inference budget; step imgsz / model / detection stride down when "
+             "over it and back up when well under (0 = off)",
+    )
+    parser.add_argument(
+        "--slo-models",
+        help="comma-separated models for the SLO ladder, best first, all preloaded "
+             "(default: --model only), e.g. yolov8s.pt,yolov8n.pt",
+    )
+    parser.add_argument(
+        "--slo-imgsz",
+        default="640,512,416,320",
+        help="comma-separated input sizes for the SLO ladder, largest first",
+    )
+    parser.add_argument(
+        "--slo-max-stride",
+        type=int,
+        default=3,
+        help="last resort: run detection only every Nth frame (up to this N)",
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=0.5,
+        help="seconds without a frame before the source counts as stalled; the last "
+             "frame is then repeated at the source frame rate, marked \"stale\"",
+    )
+    parser.add_argument(
+        "--reconnect-max-backoff",
+        type=float,
+        default=10.0,
+        help="upper bound (s) of the exponential backoff between source reopen attempts",
+    )
+    parser.add_argument(
+        "--gps",
+        metavar="SOURCE",
+        help="add the position at each frame's capture time to the metadata as "
+             "\"gps\": [lat, lon, alt_m, speed_mps, course_deg, age_ms]. SOURCE: "
+             "serial:/dev/ttyUSB0[:baud] | gpsd[:host[:port]] | replay:track.nmea[:speed]",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=0.0,
+        help="print a JSON stats line every N seconds (0 = off)",
+    )
+    parser.add_argument(
+        "--verbose", 
+        action="store_true", 
+        help="Enable verbose SEI injection logging (default: quiet)"
+    )
+    args = parser.parse_args()
+    
+    # Set verbose logging for SEI injector / header-ext probe
+    SeiInjector.verbose = args.verbose
+    SeiProbeInjector.verbose = args.verbose
+    HeaderExtInjector.verbose = args.verbose
+
+    if args.infer_workers and (args.static_threshold > 0 or args.motion_roi or args.tiled):
+        parser.error("--infer-workers cannot be combined with --static-threshold, --motion-roi or --tiled")
+    if args.slo_budget_ms > 0 and (args.infer_workers or args.tiled):
+        parser.error("--slo-budget-ms cannot be combined with --infer-workers or --tiled "
+                     "(--tiled has its own --tile-budget-ms)")
+
+    yolo = None
+    if not args.infer_workers:
+        print("Loading YOLO model...")
+        yolo = YOLO(args.model)
+        print(f"✅ YOLO model loaded: {args.model}")
+
+    # parse output
+    # rtsp://127.0.0.1:8554/stream
+    parts = args.output.split("/")
+    host_port = parts[2]  # 127.0.0.1:8554
     path = "/" + parts[3] if len(parts) > 3 else "/stream"
     port = int(host_port.split(":")[1])
 
-    factory = YoloRTSPFactory(args.input, yolo)
-    server = YoloRTSPServer(factory, port=port, mount=path)
+    renditions = [
+        Rendition.parse(spec, default_mount=path, default_codec=args.codec,
+                        default_metadata_track=args.metadata_track,
+                        default_transport=args.transport, default_sei_mode=args.sei_mode,
+                        default_encoder=args.encoder_profile)
+        for spec in args.rendition
+    ]
+    if not renditions:
+        renditions = [Rendition(mount=path, codec=args.codec, metadata_track=args.metadata_track,
+                                transport=args.transport, sei_mode=args.sei_mode,
+                                encoder=args.encoder_profile)]
+    for rendition in renditions:
+        rendition.meta_budget = args.meta_budget
+        rendition.budget_policy = args.budget_policy
+        if RTP_MTU - hdrext_reserve(rendition.hdrext_budget) < RTP_MTU // 2:
+            parser.error(f"--meta-budget {args.meta_budget} leaves less than half of the "
+                         f"{RTP_MTU}-byte RTP packets for video with --transport hdrext")
+    mounts = [r.mount for r in renditions]
+    if len(set(mounts)) != len(mounts):
+        parser.error(f"duplicate rendition mount points: {mounts}")
+
+    # hub runs at the largest rendition size; smaller ones downscale from it
+    ref = max(renditions, key=lambda r: r.width * r.height)
+    scene_cache = None
+    if args.static_threshold > 0:
+        scene_cache = StaticSceneCache(args.static_threshold, args.static_max_age)
+    roi_gate = None
+    if args.motion_roi:
+        roi_gate = MotionRoiGate(args.roi_max, args.roi_full_frac, args.roi_refresh)
+    if args.motion_roi and args.tiled:
+        parser.error("--motion-roi and --tiled are mutually exclusive")
+    tiler = None
+    if args.tiled:
+        tiler = TiledInference(args.tile_size, args.tile_overlap, args.tile_budget_ms,
+                               args.tile_workers, model_path=args.model)
+    slo = None
+    if args.slo_budget_ms > 0:
+        slo_models = []
+        for model_path in (args.slo_models.split(",") if args.slo_models else [args.model]):
+            model = yolo if model_path == args.model else YOLO(model_path)
+            slo_models.append((os.path.splitext(os.path.basename(model_path))[0], model))
+        imgsizes = sorted({int(v) for v in args.slo_imgsz.split(",")}, reverse=True)
+        slo = QualityController(slo_models, imgsizes, args.slo_budget_ms,
+                                max_stride=args.slo_max_stride, preprocess=args.preprocess)
+        print(f"✅ SLO controller: {args.slo_budget_ms} ms budget, {len(slo.levels)} levels")
+    gps = None
+    if args.gps:
+        gps = GpsReader(args.gps)
+        gps.start()
+    workers = None
+    if args.infer_workers:
+        workers = InferenceWorkers(args.model, args.infer_workers, ref.width, ref.height,
+                                   imgsz=args.imgsz, preprocess=args.preprocess)
+    hub = FrameHub(args.input, yolo, width=ref.width, height=ref.height,
+                   imgsz=args.imgsz, preprocess=args.preprocess, scene_cache=scene_cache,
+                   roi_gate=roi_gate, tiler=tiler, workers=workers, slo=slo, gps=gps,
+                   stall_timeout=args.stall_timeout, max_backoff=args.reconnect_max_backoff)
+
+    server = YoloRTSPServer(port=port)
+    factories = []
+    for rendition in renditions:
+        print(f"   rendition {rendition}")
+        factory = YoloRTSPFactory(hub, rendition)
+        factory.feeder.min_keyframe_interval = args.join_keyframe_interval
+        factories.append(factory)
+        server.add_factory(rendition.mount, factory)
+
+    recorder = None
+    if args.record_dir:
+        recorder = SegmentRecorder(hub, args.record_dir, fmt=args.record_format,
+                                   segment_seconds=args.segment_seconds, codec=ref.codec,
+                                   bitrate=ref.bitrate, meta_budget=args.meta_budget,
+                                   budget_policy=args.budget_policy, sei_mode=args.sei_mode,
+                                   encoder=ref.encoder)
+        recorder.start()
+
+    publisher = None
+    if args.meta_socket:
+        publisher = MetaPublisher(hub, args.meta_socket)
+        publisher.start()
+
+    def report_stats():
+        stats = hub.stats()
+        stats["renditions"] = {f.rendition.mount: f.feeder.stats() for f in factories}
+        if publisher is not None:
+            stats["meta_socket"] = publisher.stats()
+        print(f"[stats] {json.dumps(stats, separators=(',', ':'))}")
+        return True
+
+    if args.stats_interval > 0:
+        GLib.timeout_add(int(args.stats_interval * 1000), report_stats)
 
     loop = GLib.MainLoop()
     try:
@@ -382,6 +3090,18 @@ def main():
     except KeyboardInterrupt:
         print("Shutting down...")
         loop.quit()
+    finally:
+        if recorder is not None:
+            recorder.stop()
+        if publisher is not None:
+            publisher.stop()
+        if gps is not None:
+            gps.stop()
+        hub.source.close()
+        if args.stats_interval > 0:
+            report_stats()
+        if workers is not None:
+            workers.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Round-trip check for chunked SEI payloads: build the NALs the server emits
+for awkward chunk sequence numbers and parse them back with the client and
+the offline extractor. The binary (seq, part, count) header is the only
+place our SEI can contain 00 00, so these seqs exercise emulation prevention:
+
+  seq 0      -> 00 00 00 (part 0) and 00 00 01 (part 1) without escaping
+  seq 256    -> 01 00 00 03 with count 3, which parsers would strip
+  seq 65535  -> the u16 wrap
+
+Unsplit payloads of several KB check the long ff-coded payload_size
+(one 0xFF byte per 255 bytes) between the NAL header and the UUID.
+
+  python utils/check_sei_roundtrip.py
+"""
+import os
+import sys
+import json
+import uuid
+import tempfile
+
+# server.py / client_sei.py live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server import CODECS, build_chunked_sei, build_sei_udu, encode_meta
+from client_sei import extract_sei_json
+from extract_sei_offline import DEFAULT_UUID as OFFLINE_UUID, CHUNK_UUID, PartJoiner, scan_chunk
+
+SEQS = (0, 1, 255, 256, 65535)
+PART_COUNTS = (1, 2, 3, 255)
+UNSPLIT_SIZES = (200, 3000, 7500, 70000)
+
+
+def fake_meta(size: int) -> dict:
+    dets = [{"cls": 0, "name": "person", "conf": 0.9, "xyxy": [1.5, 2.5, 3.5, 4.5]}] * (size // 60 + 1)
+    return {"v": 1, "ts_ns": 0, "frame": 7, "yolo": dets}
+
+
+def offline_roundtrip(au: bytes):
+    with tempfile.NamedTemporaryFile(suffix=".h264", delete=False) as f:
+        f.write(au)
+        path = f.name
+    try:
+        joiner = PartJoiner()
+        out = []
+        job = (path, 0, len(au), uuid.UUID(OFFLINE_UUID).bytes, uuid.UUID(CHUNK_UUID).bytes)
+        for offset, is_part, user_data in scan_chunk(job):
+            if is_part:
+                joined = joiner.add(offset, user_data)
+                if joined is None:
+                    continue
+                offset, user_data = joined
+            out.append(json.loads(user_data))
+        return out
+    finally:
+        os.unlink(path)
+
+
+def main():
+    failures = 0
+    for codec in CODECS:
+        for seq in SEQS:
+            for count in PART_COUNTS:
+                meta = fake_meta(count * 120)
+                payload = encode_meta(meta)
+                part = -(-len(payload) // count)
+                au = build_chunked_sei(codec, payload, part, seq)
+                # a plain SEI after the parts must survive too
+                au += build_sei_udu(codec, uuid.UUID(OFFLINE_UUID).bytes, encode_meta({"v": 1, "frame": 8}))
+                client = list(extract_sei_json(au, codec))
+                offline = offline_roundtrip(au)
+                ok = client == [meta, {"v": 1, "frame": 8}] and offline == client
+                if not ok:
+                    failures += 1
+                    print(f"❌ {codec} seq={seq} parts={count}: client={len(client)} offline={len(offline)}")
+        for size in UNSPLIT_SIZES:
+            meta = fake_meta(size)
+            au = build_sei_udu(codec, uuid.UUID(OFFLINE_UUID).bytes, encode_meta(meta))
+            client = list(extract_sei_json(au, codec))
+            offline = offline_roundtrip(au)
+            if not (client == [meta] and offline == client):
+                failures += 1
+                print(f"❌ {codec} unsplit ~{size} B: client={len(client)} offline={len(offline)}")
+    if failures:
+        return 1
+    print(f"✅ {len(CODECS) * len(SEQS) * len(PART_COUNTS)} chunked and "
+          f"{len(CODECS) * len(UNSPLIT_SIZES)} unsplit SEI round trips")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmark the server's encoder profiles (server.py --encoder-profile).
+
+Every profile encodes the same reference clip (or videotestsrc) through the
+same chain the server builds:
+    source -> I420 -> <profile encoder> -> pyseiinjector4 -> parse -> pay -> depay
+without a network in between. Each profile reports:
+  - encode ms/frame: the time a frame spends between the encoder's sink and
+    src pads (matched by PTS, so lookahead / frame-thread delay is included)
+  - process CPU ms/frame and CPU % of one core at the stream's real-time fps;
+    the decode/convert cost of a baseline pass without an encoder is subtracted
+  - bitrate (kbit/s) over the stream duration
+  - SEI survival: share of access units that still carry our SEI after depay
+
+  python utils/encoder_bench.py --clip reference.mp4 --frames 900
+  python utils/encoder_bench.py --profiles lowlat,lowcpu --json encoders.json
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+# server.py / client_sei.py live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst, GLib
+
+from server import ENCODER_PROFILES, SeiInjector, RollingStats, encode_meta
+from client_sei import extract_sei_json
+
+Gst.init(None)
+
+
+def source_chain(clip, frames, width, height, fps):
+    if clip:
+        src = f"uridecodebin uri={Gst.filename_to_uri(os.path.abspath(clip))} "
+    else:
+        src = f"videotestsrc num-buffers={frames} pattern=ball "
+    return (
+        f"{src}! videoconvert ! videoscale ! videorate "
+        f"! video/x-raw,format=I420,width={width},height={height},framerate={fps}/1 "
+    )
+
+
+def run_pipeline(pipeline, frames, on_frame=None):
+    """Play until EOS or `frames` raw frames; return (frames seen, cpu s, wall s)"""
+    loop = GLib.MainLoop()
+    seen = [0]
+
+    def on_raw(pad, info):
+        if seen[0] >= frames:
+            return Gst.PadProbeReturn.DROP
+        seen[0] += 1
+        if on_frame is not None:
+            on_frame(info.get_buffer())
+        if seen[0] == frames:
+            # clip longer than --frames: end it here
+            GLib.idle_add(lambda: pipeline.send_event(Gst.Event.new_eos()) and False)
+        return Gst.PadProbeReturn.OK
+
+    pipeline.get_by_name("raw").get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, on_raw)
+
+    def on_msg(bus, msg):
+        if msg.type == Gst.MessageType.ERROR:
+            err, _dbg = msg.parse_error()
+            print(f"❌ ERROR: {err}")
+            loop.quit()
+        elif msg.type == Gst.MessageType.EOS:
+            loop.quit()
+
+    bus = pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", on_msg)
+
+    cpu0 = os.times()
+    wall0 = time.perf_counter()
+    pipeline.set_state(Gst.State.PLAYING)
+    loop.run()
+    pipeline.set_state(Gst.State.NULL)
+    wall = time.perf_counter() - wall0
+    cpu1 = os.times()
+    return seen[0], (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system), wall
+
+
+def run_baseline(args):
+    """Decode + convert only: the CPU every profile pays before encoding"""
+    pipeline = Gst.parse_launch(
+        source_chain(args.clip, args.frames, args.width, args.height, args.fps)
+        + "! identity name=raw ! fakesink sync=false"
+    )
+    frames, cpu, _wall = run_pipeline(pipeline, args.frames)
+    return cpu / max(frames, 1)
+
+
+def run_profile(name, args, baseline_cpu):
+    profile = ENCODER_PROFILES[name]
+    pipeline = Gst.parse_launch(
+        source_chain(args.clip, args.frames, args.width, args.height, args.fps)
+        + "! identity name=raw "
+        f"! {profile.element('h264', args.bitrate)}"
+        "! video/x-h264,stream-format=byte-stream,alignment=au "
+        f"! {SeiInjector.GST_PLUGIN_NAME} name=sei idr-only=false "
+        "! h264parse name=parse config-interval=-1 ! video/x-h264,stream-format=byte-stream,alignment=au "
+        "! rtph264pay pt=96 config-interval=-1 aggregate-mode=zero-latency "
+        "! rtph264depay ! video/x-h264,stream-format=byte-stream,alignment=au "
+        "! appsink name=sink emit-signals=true sync=false"
+    )
+    injector = pipeline.get_by_name("sei")
+    encode_ns = RollingStats(window=args.frames)
+    entered = {}
+    encoded_bytes = [0]
+    aus = [0, 0]  # received, with our SEI
+    frame_no = [0]
+
+    def on_frame(buf):
+        injector.set_latest_payload(encode_meta({"v": 1, "ts_ns": time.time_ns(),
+                                                 "frame": frame_no[0], "yolo": []}))
+        frame_no[0] += 1
+
+    enc = pipeline.get_by_name("enc")
+
+    def on_enc_sink(pad, info):
+        entered[info.get_buffer().pts] = time.perf_counter_ns()
+        return Gst.PadProbeReturn.OK
+
+    def on_enc_src(pad, info):
+        buf = info.get_buffer()
+        t0 = entered.pop(buf.pts, None)
+        if t0 is not None:
+            encode_ns.add(time.perf_counter_ns() - t0)
+        encoded_bytes[0] += buf.get_size()
+        return Gst.PadProbeReturn.OK
+
+    enc.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, on_enc_sink)
+    enc.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, on_enc_src)
+
+    def on_sample(sink):
+        sample = sink.emit("pull-sample")
+        if sample:
+            buf = sample.get_buffer()
+            ok, mapinfo = buf.map(Gst.MapFlags.READ)
+            if ok:
+                data = bytes(mapinfo.data)
+                buf.unmap(mapinfo)
+                aus[0] += 1
+                if any(extract_sei_json(data)):
+                    aus[1] += 1
+        return Gst.FlowReturn.OK
+
+    pipeline.get_by_name("sink").connect("new-sample", on_sample)
+
+    frames, cpu, wall = run_pipeline(pipeline, args.frames, on_frame)
+    cpu_per_frame = max(cpu / max(frames, 1) - baseline_cpu, 0.0)
+    duration = frames / args.fps
+    return {
+        "profile": name,
+        "encoder": profile.element("h264", args.bitrate).strip(),
+        "frames": frames,
+        "encode_ms": encode_ns.summary(1e-6),
+        "cpu_ms_per_frame": round(1000 * cpu_per_frame, 3),
+        # share of one core needed to keep up with the stream in real time
+        "cpu_pct_realtime": round(100 * cpu_per_frame * args.fps, 1),
+        "bitrate_kbps": round(8 * encoded_bytes[0] / max(duration, 1e-9) / 1000, 1),
+        "sei_survival": round(aus[1] / max(aus[0], 1), 4),
+        "wall_s": round(wall, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare server.py encoder profiles: "
+                                             "latency, CPU, bitrate and SEI survival")
+    ap.add_argument("--clip", help="reference clip (default: videotestsrc pattern=ball)")
+    ap.add_argument("--frames", type=int, default=600, help="frames per profile")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--bitrate", type=int, default=0, help="kbit/s for every profile (default: profile's own)")
+    ap.add_argument("--profiles", default=",".join(ENCODER_PROFILES),
+                    help="comma-separated profiles to run")
+    ap.add_argument("--json", help="write per-profile results to this file")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.profiles.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENCODER_PROFILES]
+    if unknown:
+        ap.error(f"unknown profiles {unknown} (expected from {list(ENCODER_PROFILES)})")
+
+    print("=" * 92)
+    print(f"Encoder benchmark: {args.clip or 'videotestsrc'} -> {args.width}x{args.height}@{args.fps}, "
+          f"{args.frames} frames per profile")
+    print("=" * 92)
+    baseline = run_baseline(args)
+    print(f"baseline decode/convert: {1000 * baseline:.3f} CPU ms/frame (subtracted below)")
+    print(" profile    | enc p50   p99 ms | cpu ms/frame  cpu % | kbit/s   | SEI")
+
+    results = []
+    for name in names:
+        if Gst.ElementFactory.find("openh264enc" if ENCODER_PROFILES[name].encoder == "openh264"
+                                   else "x264enc") is None:
+            print(f" {name:<10} | encoder not installed, skipped")
+            continue
+        row = run_profile(name, args, baseline)
+        results.append(row)
+        enc = row["encode_ms"]
+        print(f" {name:<10} | {str(enc.get('p50', '-')):>7} {str(enc.get('p99', '-')):>7} | "
+              f"{row['cpu_ms_per_frame']:>12} {row['cpu_pct_realtime']:>6} | "
+              f"{row['bitrate_kbps']:>8} | {100 * row['sei_survival']:.1f}%")
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
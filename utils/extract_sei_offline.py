@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Offline SEI extractor for recorded Annex-B (.h264 / .h265) files.
+
+The file is memory-mapped and cut into chunks at start-code boundaries.
+Each chunk is scanned in a process pool by searching for our UUID (a C-level
+mmap.find), so only our own SEI NALs are ever parsed in Python; slice data
+is skipped without being copied. Results come back in file order.
+
+Output:
+  jsonl - one metadata JSON object per line (payload bytes passed through as-is)
+  csv   - one row per detection: offset, frame, ts_ns, cls, name, conf, x1, y1, x2, y2
+
+No GStreamer needed, so it runs on any archive box.
+"""
+import os
+import sys
+import csv
+import json
+import mmap
+import struct
+import uuid
+import argparse
+from multiprocessing import Pool
+
+DEFAULT_UUID = "6c4b8b04-43c3-41a2-93b7-3a7b70f7ef00"
+# payloads above the server's --meta-budget are split into parts with this UUID
+CHUNK_UUID = "6c4b8b04-43c3-41a2-93b7-3a7b70f7ef01"
+CHUNK_HEADER = struct.Struct(">HBB")  # seq (u16), part index, part count
+START_CODE = b"\x00\x00\x01"
+EMULATION_PREVENTION = b"\x00\x00\x03"
+
+
+def chunk_bounds(mm, size: int, chunk_size: int):
+    """Split [0, size) into ~chunk_size pieces that start on a start code"""
+    bounds = [0]
+    pos = chunk_size
+    while pos < size:
+        sc = mm.find(START_CODE, pos)
+        if sc == -1:
+            break
+        # keep 4-byte start codes whole
+        if sc > 0 and mm[sc - 1] == 0:
+            sc -= 1
+        if sc > bounds[-1]:
+            bounds.append(sc)
+        pos = sc + chunk_size
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_ff_coded(mm, idx: int, end: int):
+    """SEI payload type / size: run of 0xFF then a final byte"""
+    value = 0
+    while idx < end and mm[idx] == 0xFF:
+        value += 255
+        idx += 1
+    if idx >= end:
+        return None, idx
+    return value + mm[idx], idx + 1
+
+
+def _read_rbsp(mm, pos: int, n: int, size: int):
+    """`n` RBSP bytes of the EBSP starting at `pos`, emulation-prevention bytes dropped"""
+    out = []
+    while n > 0:
+        if pos + n > size:
+            return None
+        # an escape whose 0x03 falls inside the next n bytes
+        ep = mm.find(EMULATION_PREVENTION, pos, pos + n)
+        if ep == -1:
+            out.append(mm[pos:pos + n])
+            break
+        out.append(mm[pos:ep + 2])
+        n -= ep + 2 - pos
+        pos = ep + 3
+    return b"".join(out)
+
+
+def _parse_sei_at(mm, sc: int, uuid_pos: int, size: int):
+    """
+    `sc` points just past a start code. Return the user_data bytes if a
+    user_data_unregistered SEI whose UUID sits exactly at uuid_pos starts here.
+    """
+    hdr = mm[sc]
+    if hdr & 0x1F == 6 and hdr & 0x80 == 0:
+        idx = sc + 1  # H.264 SEI
+    elif (hdr >> 1) & 0x3F in (39, 40):
+        idx = sc + 2  # H.265 prefix/suffix SEI
+    else:
+        return None
+    payload_type, idx = _read_ff_coded(mm, idx, uuid_pos)
+    if payload_type != 5:
+        return None
+    payload_size, idx = _read_ff_coded(mm, idx, uuid_pos)
+    if payload_size is None or idx != uuid_pos or payload_size < 16:
+        return None
+    # payload_size counts RBSP bytes: undo emulation prevention (binary chunk headers)
+    body = _read_rbsp(mm, uuid_pos, payload_size, size)
+    return None if body is None else body[16:]
+
+
+def _scan_uuid(mm, uuid_bytes: bytes, start: int, end: int, size: int, is_part: bool, out: list):
+    pos = start
+    while True:
+        hit = mm.find(uuid_bytes, pos, end)
+        if hit == -1:
+            break
+        pos = hit + 16
+        # start code (3) + NAL header (<= 2) + payload type (1) precede the
+        # UUID, then payload_size: one 0xFF per 255 bytes plus a last byte,
+        # for a payload that can't run past the end of the file
+        sc = mm.rfind(START_CODE, max(start, hit - 7 - (size - hit) // 255), hit)
+        if sc == -1:
+            continue
+        user_data = _parse_sei_at(mm, sc + 3, hit, size)
+        if user_data is not None:
+            out.append((sc, is_part, user_data))
+
+
+def scan_chunk(job):
+    """
+    Worker: return [(offset, is_part, user_data), ...] in file order for
+    every SEI with our UUID (whole payloads) or the chunk UUID (parts) in [start, end)
+    """
+    path, start, end, uuid_bytes, chunk_uuid_bytes = job
+    out = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _scan_uuid(mm, uuid_bytes, start, end, size, False, out)
+            _scan_uuid(mm, chunk_uuid_bytes, start, end, size, True, out)
+    out.sort(key=lambda item: item[0])
+    return out
+
+
+class PartJoiner:
+    """Reassemble chunked payloads; parts may span worker chunks, so state persists"""
+
+    def __init__(self):
+        self._parts = {}  # seq -> (first offset, {part: bytes})
+
+    def add(self, offset: int, user_data: bytes):
+        if len(user_data) < CHUNK_HEADER.size:
+            return None
+        seq, part, count = CHUNK_HEADER.unpack_from(user_data)
+        first, parts = self._parts.setdefault(seq, (offset, {}))
+        parts[part] = user_data[CHUNK_HEADER.size:]
+        if len(parts) < count:
+            return None
+        del self._parts[seq]
+        return first, b"".join(parts[i] for i in range(count))
+
+
+def csv_rows(offset: int, user_data: bytes):
+    try:
+        meta = json.loads(user_data)
+    except ValueError:
+        return
+    for det in meta.get("yolo", []):
+        x1, y1, x2, y2 = det.get("xyxy", [None] * 4)
+        yield (offset, meta.get("frame"), meta.get("ts_ns"), det.get("cls"), det.get("name"),
+               det.get("conf"), x1, y1, x2, y2)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel mmap SEI extractor for Annex-B recordings")
+    ap.add_argument("input", help="recorded .h264 / .h265 (Annex-B) file")
+    ap.add_argument("-o", "--output", help="output file (default: stdout)")
+    ap.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    ap.add_argument("--uuid", default=DEFAULT_UUID, help="SEI user_data_unregistered UUID")
+    ap.add_argument("--chunk-uuid", default=CHUNK_UUID, help="UUID of split (chunked) payload parts")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-mb", type=int, default=64, help="approximate chunk size per task")
+    args = ap.parse_args()
+
+    uuid_bytes = uuid.UUID(args.uuid).bytes
+    with open(args.input, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            print("Empty input", file=sys.stderr)
+            return 1
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bounds = chunk_bounds(mm, size, args.chunk_mb * 1024 * 1024)
+
+    chunk_uuid_bytes = uuid.UUID(args.chunk_uuid).bytes
+    jobs = [(args.input, start, end, uuid_bytes, chunk_uuid_bytes) for start, end in bounds]
+    joiner = PartJoiner()
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = csv.writer(out) if args.format == "csv" else None
+    if writer:
+        writer.writerow(["offset", "frame", "ts_ns", "cls", "name", "conf", "x1", "y1", "x2", "y2"])
+
+    count = 0
+    try:
+        with Pool(args.workers) as pool:
+            # imap keeps chunk (= file) order
+            for results in pool.imap(scan_chunk, jobs):
+                for offset, is_part, user_data in results:
+                    if is_part:
+                        joined = joiner.add(offset, user_data)
+                        if joined is None:
+                            continue
+                        offset, user_data = joined
+                    count += 1
+                    if writer:
+                        writer.writerows(csv_rows(offset, user_data))
+                    else:
+                        out.write(user_data.decode("utf-8", errors="replace"))
+                        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"✅ {count} SEI payloads from {size / 1e6:.1f} MB in {len(jobs)} chunks", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Local subscriber for server.py --meta-socket.
+
+Each message on the SOCK_SEQPACKET socket is one frame's metadata record,
+byte-for-byte the JSON the server puts in the SEI (hub resolution), so no
+RTSP session, depayloader or SEI parser is needed on the same host.
+
+  python utils/meta_subscriber.py /tmp/yolo-meta.sock            # print detections
+  python utils/meta_subscriber.py /tmp/yolo-meta.sock --jsonl    # raw records, one per line
+  python utils/meta_subscriber.py /tmp/yolo-meta.sock --rate     # frames/s + missed frame ids
+
+Stdlib only.
+"""
+import sys
+import json
+import time
+import socket
+import argparse
+
+MAX_MESSAGE = 1 << 20  # SEQPACKET truncates anything larger than the recv size
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Read per-frame YOLO metadata from server.py --meta-socket")
+    ap.add_argument("path", help="Unix socket path given to --meta-socket")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--jsonl", action="store_true", help="write raw records, one per line")
+    mode.add_argument("--rate", action="store_true", help="only report frames/s and missed frames")
+    args = ap.parse_args()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    try:
+        sock.connect(args.path)
+    except OSError as e:
+        print(f"❌ Cannot connect to {args.path}: {e}", file=sys.stderr)
+        return 1
+    print(f"✅ Subscribed to unix:{args.path}", file=sys.stderr)
+
+    last_frame = None
+    missed = 0
+    count = 0
+    window_start = time.monotonic()
+    try:
+        while True:
+            data = sock.recv(MAX_MESSAGE)
+            if not data:
+                print("Server closed the socket", file=sys.stderr)
+                break
+            if args.jsonl:
+                sys.stdout.write(data.decode("utf-8", errors="replace") + "\n")
+                sys.stdout.flush()
+                continue
+            meta = json.loads(data)
+            frame_id = meta.get("frame")
+            if last_frame is not None and frame_id is not None and frame_id > last_frame + 1:
+                # skipped by the server's pacing, or dropped because we were slow
+                missed += frame_id - last_frame - 1
+            last_frame = frame_id
+            count += 1
+            if args.rate:
+                now = time.monotonic()
+                if now - window_start >= 1.0:
+                    print(f"{count / (now - window_start):.1f} frames/s, missed {missed}")
+                    count = 0
+                    window_start = now
+                continue
+            dets = meta.get("yolo", [])
+            if dets:
+                print(f"[frame {frame_id}] {len(dets)} detections:")
+                for det in dets:
+                    print(f"  - {det.get('name')} {det.get('conf'):.2f} {det.get('xyxy')}")
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
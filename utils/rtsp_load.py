@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+RTSP load generator for server.py: how far does the shared media scale?
+
+Opens N concurrent RTSP sessions against one mount, all in this process on
+one GLib main loop. Each session does depay + SEI (or header-extension)
+extraction only, no decoding. N is ramped in steps; for every step it records:
+  - per-session fps and metadata loss (frame-id gaps, see LatencyTracker)
+  - metadata latency (capture -> here, same host so no clock offset)
+  - server CPU % and RSS from /proc/<pid> (and our own CPU, to tell
+    a saturated load generator from a saturated server)
+
+A step is flagged when sessions fall below 90% of the stream fps or lose more
+than 1% of the frames. That's where the single shared pipeline (or the
+Python need-data / GLib loop behind it) stops keeping up.
+
+  python utils/rtsp_load.py --url rtsp://127.0.0.1:8554/stream --sessions 1,2,4,8,16,32,64
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+# client_sei.py lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst, GLib
+
+from client_sei import CODECS, LatencyTracker, extract_sei_json, attach_hdrext_reader
+
+Gst.init(None)
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def find_server_pid():
+    """First process whose command line runs server.py, or None"""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                argv = f.read().split(b"\0")
+        except OSError:
+            continue
+        if any(os.path.basename(arg) == b"server.py" for arg in argv):
+            return int(entry)
+    return None
+
+
+class ProcSampler:
+    """CPU % over an interval and current RSS of one process, from /proc"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._t0 = None
+        self._cpu0 = None
+
+    def _cpu_ticks(self) -> int:
+        with open(f"/proc/{self.pid}/stat", encoding="utf-8") as f:
+            # comm may contain spaces: fields after the closing paren
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[11]) + int(fields[12])  # utime + stime
+
+    def _rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def start(self):
+        self._t0 = time.monotonic()
+        self._cpu0 = self._cpu_ticks()
+
+    def sample(self) -> dict:
+        try:
+            cpu = (self._cpu_ticks() - self._cpu0) / CLK_TCK
+            rss = self._rss_mb()
+        except OSError:
+            return {"error": f"pid {self.pid} gone"}
+        wall = time.monotonic() - self._t0
+        return {"cpu_pct": round(100 * cpu / max(wall, 1e-9), 1), "rss_mb": round(rss, 1)}
+
+
+class Session:
+    """One RTSP client: rtspsrc -> depay -> appsink, metadata into a LatencyTracker"""
+
+    def __init__(self, url: str, codec: str, transport: str, on_error):
+        self.pipeline = Gst.parse_launch(
+            f"rtspsrc location={url} latency=0 ! rtp{codec}depay name=depay ! "
+            f"video/x-{codec},stream-format=byte-stream,alignment=au ! "
+            "appsink name=sink emit-signals=true sync=false max-buffers=4 drop=true"
+        )
+        self.codec = codec
+        self.transport = transport
+        self.errors = 0
+        self.reset()
+        sink = self.pipeline.get_by_name("sink")
+        sink.connect("new-sample", self._on_sample)
+        if transport == "hdrext":
+            attach_hdrext_reader(self.pipeline.get_by_name("depay"), self._on_meta)
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::error", lambda _bus, msg: on_error(self, msg))
+
+    def reset(self):
+        # same host as the server: its clock is ours
+        self.tracker = LatencyTracker(clock_offset_ns=0)
+        self.aus = 0
+
+    def _on_meta(self, meta, recv_ns=None, client_ns=None):
+        self.tracker.add(meta, recv_ns, client_ns)
+
+    def _on_sample(self, sink):
+        sample = sink.emit("pull-sample")
+        if not sample:
+            return Gst.FlowReturn.OK
+        self.aus += 1
+        if self.transport == "sei":
+            recv_ns = time.time_ns()
+            t0 = time.perf_counter_ns()
+            buf = sample.get_buffer()
+            ok, mapinfo = buf.map(Gst.MapFlags.READ)
+            if ok:
+                data = bytes(mapinfo.data)
+                buf.unmap(mapinfo)
+                for meta in extract_sei_json(data, self.codec):
+                    self._on_meta(meta, recv_ns, time.perf_counter_ns() - t0)
+        return Gst.FlowReturn.OK
+
+    def start(self):
+        self.pipeline.set_state(Gst.State.PLAYING)
+
+    def stop(self):
+        self.pipeline.set_state(Gst.State.NULL)
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 2)
+
+
+def summarize_step(n, sessions, seconds, server, own, fps_target):
+    fps = [s.aus / seconds for s in sessions]
+    frames = [s.tracker.frames for s in sessions]
+    lost = [s.tracker.lost for s in sessions]
+    lat = [s.tracker.e2e_ms.summary() for s in sessions]
+    loss_pct = 100 * sum(lost) / max(sum(frames) + sum(lost), 1)
+    row = {
+        "sessions": n,
+        "fps_min": round(min(fps), 1) if fps else 0,
+        "fps_mean": round(sum(fps) / max(len(fps), 1), 1),
+        "meta_loss_pct": round(loss_pct, 2),
+        "latency_p50_ms": _pct([x["p50"] for x in lat if "p50" in x], 50),
+        "latency_p99_ms": _pct([x["p99"] for x in lat if "p99" in x], 99),
+        "errors": sum(s.errors for s in sessions),
+        "server": server,
+        "loadgen": own,
+    }
+    row["saturated"] = row["fps_min"] < 0.9 * fps_target or loss_pct > 1.0
+    return row
+
+
+def print_row(row):
+    server = row["server"] or {}
+    flag = "  ⚠ saturated" if row["saturated"] else ""
+    print(f"{row['sessions']:>5} | {row['fps_min']:>7} {row['fps_mean']:>8} | "
+          f"{row['meta_loss_pct']:>6}% | {str(row['latency_p50_ms']):>7} {str(row['latency_p99_ms']):>7} | "
+          f"{str(server.get('cpu_pct', '-')):>7} {str(server.get('rss_mb', '-')):>8} | "
+          f"{row['loadgen'].get('cpu_pct', '-'):>7}{flag}")
+    sys.stdout.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Ramp concurrent RTSP sessions against server.py")
+    ap.add_argument("--url", default="rtsp://127.0.0.1:8554/stream")
+    ap.add_argument("--sessions", default="1,2,4,8,16,32", help="comma-separated ramp of session counts")
+    ap.add_argument("--step-seconds", type=float, default=15.0, help="measurement time per step")
+    ap.add_argument("--warmup", type=float, default=3.0, help="settle time after adding sessions")
+    ap.add_argument("--codec", choices=CODECS, default="h264")
+    ap.add_argument("--transport", choices=["sei", "hdrext"], default="sei")
+    ap.add_argument("--fps", type=float, default=30.0, help="expected stream fps")
+    ap.add_argument("--server-pid", type=int, help="server process for CPU/RSS (default: find server.py)")
+    ap.add_argument("--json", help="write per-step results to this file")
+    args = ap.parse_args()
+
+    ramp = [int(v) for v in args.sessions.split(",")]
+    pid = args.server_pid or find_server_pid()
+    server = ProcSampler(pid) if pid else None
+    own = ProcSampler(os.getpid())
+    if server is None:
+        print("⚠️  server.py process not found; pass --server-pid for CPU/RSS", file=sys.stderr)
+
+    loop = GLib.MainLoop()
+    sessions = []
+    results = []
+
+    def on_error(session, msg):
+        err, _dbg = msg.parse_error()
+        session.errors += 1
+        print(f"❌ session {sessions.index(session)}: {err}", file=sys.stderr)
+
+    print("=" * 92)
+    print(f"RTSP load: {args.url} ({args.codec}, {args.transport}), ramp {ramp}, "
+          f"{args.step_seconds:.0f}s per step, server pid {pid}")
+    print("=" * 92)
+    print(" sess |  fps min     mean |   loss | lat p50     p99 | srv cpu%  srv rss | gen cpu%")
+
+    def run_step(i):
+        if i >= len(ramp):
+            loop.quit()
+            return False
+        n = ramp[i]
+        while len(sessions) < n:
+            session = Session(args.url, args.codec, args.transport, on_error)
+            sessions.append(session)
+            session.start()
+
+        def measure():
+            for session in sessions:
+                session.reset()
+            if server:
+                server.start()
+            own.start()
+            GLib.timeout_add(int(args.step_seconds * 1000), finish)
+            return False
+
+        def finish():
+            row = summarize_step(n, sessions, args.step_seconds,
+                                 server.sample() if server else None, own.sample(), args.fps)
+            results.append(row)
+            print_row(row)
+            GLib.idle_add(run_step, i + 1)
+            return False
+
+        GLib.timeout_add(int(args.warmup * 1000), measure)
+        return False
+
+    GLib.idle_add(run_step, 0)
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for session in sessions:
+            session.stop()
+
+    knee = next((row["sessions"] for row in results if row["saturated"]), None)
+    if knee is not None:
+        print(f"\nSaturation first seen at {knee} sessions")
+    elif results:
+        print(f"\nNo saturation up to {results[-1]['sessions']} sessions")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark metadata transports: SEI injection (element or pad probe) vs RTP
+header extension.
+
+Runs videotestsrc -> x264enc -> [pyseiinjector4] -> rtph264pay -> rtph264depay
+locally (no network) for each transport and reports:
+  - per-AU injection cost: for the element, the time an AU spends between its
+    sink and src pads (vfunc dispatch + buffer allocation + do_transform);
+    for sei-probe / hdrext, the probe itself
+  - per-AU extraction cost on the receive side
+  - metadata latency (stamped before encode -> parsed after depay)
+  - process CPU time per frame
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+# server.py / client_sei.py live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst, GLib
+
+from server import (SeiInjector, SeiProbeInjector, HeaderExtInjector, RollingStats, encode_meta,
+                    RTP_MTU, hdrext_reserve)
+from client_sei import extract_sei_json, read_hdrext_payload
+
+Gst.init(None)
+
+
+def fake_detections(n):
+    return [
+        {"cls": 2, "name": "car", "conf": 0.8123, "xyxy": [10.5 * i, 20.25, 110.5 * i, 220.75]}
+        for i in range(n)
+    ]
+
+
+def run_transport(transport, frames, width, height, n_dets):
+    dets = fake_detections(n_dets)
+    payload_bytes = len(encode_meta({"v": 1, "ts_ns": time.time_ns(), "frame": frames, "yolo": dets}))
+    sei = f"! {SeiInjector.GST_PLUGIN_NAME} name=sei idr-only=false " if transport == "sei" else ""
+    # same room for the header extension as the server reserves (Rendition.hdrext_budget)
+    mtu = f"mtu={RTP_MTU - hdrext_reserve(payload_bytes)} " if transport == "hdrext" else ""
+    pipeline = Gst.parse_launch(
+        f"videotestsrc num-buffers={frames} pattern=ball ! "
+        f"video/x-raw,width={width},height={height},framerate=30/1 ! "
+        "x264enc name=enc tune=zerolatency speed-preset=ultrafast key-int-max=60 byte-stream=true ! "
+        "video/x-h264,stream-format=byte-stream,alignment=au "
+        f"{sei}"
+        "! h264parse name=parse config-interval=-1 ! video/x-h264,stream-format=byte-stream,alignment=au ! "
+        f"rtph264pay name=pay pt=96 config-interval=-1 aggregate-mode=zero-latency {mtu}! "
+        "rtph264depay name=depay ! video/x-h264,stream-format=byte-stream,alignment=au ! "
+        "appsink name=sink emit-signals=true sync=false"
+    )
+    frame_no = [0]
+    latency_ns = RollingStats(window=frames)
+    extract_ns = RollingStats(window=frames)
+    received = [0]
+
+    inject_ns = RollingStats(window=frames)
+    if transport == "sei":
+        injector = pipeline.get_by_name("sei")
+        # whole element passage, not just do_transform
+        entered = []
+
+        def on_sei_sink(pad, info):
+            entered.append(time.perf_counter_ns())
+            return Gst.PadProbeReturn.OK
+
+        def on_sei_src(pad, info):
+            if entered:
+                inject_ns.add(time.perf_counter_ns() - entered.pop(0))
+            return Gst.PadProbeReturn.OK
+
+        injector.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, on_sei_sink)
+        injector.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, on_sei_src)
+    elif transport == "sei-probe":
+        injector = SeiProbeInjector("h264")
+        injector.attach(pipeline.get_by_name("parse"))
+        inject_ns = injector.probe_ns
+    else:
+        injector = HeaderExtInjector(payload_bytes)
+        injector.attach(pipeline.get_by_name("pay"))
+        inject_ns = injector.probe_ns
+
+    # stamp a fresh payload right before each raw frame is encoded
+    def on_enc_sink(pad, info):
+        meta = {"v": 1, "ts_ns": time.time_ns(), "frame": frame_no[0], "yolo": dets}
+        injector.set_latest_payload(encode_meta(meta))
+        frame_no[0] += 1
+        return Gst.PadProbeReturn.OK
+
+    pipeline.get_by_name("enc").get_static_pad("sink").add_probe(
+        Gst.PadProbeType.BUFFER, on_enc_sink
+    )
+
+    def record(meta):
+        received[0] += 1
+        latency_ns.add(time.time_ns() - meta["ts_ns"])
+
+    if transport == "hdrext":
+        def on_depay_sink(pad, info):
+            bufs = []
+            if info.type & Gst.PadProbeType.BUFFER_LIST:
+                blist = info.get_buffer_list()
+                bufs = [blist.get(i) for i in range(blist.length())]
+            else:
+                bufs = [info.get_buffer()]
+            for buf in bufs:
+                t0 = time.perf_counter_ns()
+                payload = read_hdrext_payload(buf)
+                if payload:
+                    meta = json.loads(payload)
+                    extract_ns.add(time.perf_counter_ns() - t0)
+                    record(meta)
+            return Gst.PadProbeReturn.OK
+
+        pipeline.get_by_name("depay").get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER | Gst.PadProbeType.BUFFER_LIST, on_depay_sink
+        )
+
+    def on_sample(sink):
+        sample = sink.emit("pull-sample")
+        if sample and transport != "hdrext":
+            buf = sample.get_buffer()
+            t0 = time.perf_counter_ns()
+            ok, mapinfo = buf.map(Gst.MapFlags.READ)
+            if ok:
+                data = bytes(mapinfo.data)
+                buf.unmap(mapinfo)
+                for meta in extract_sei_json(data):
+                    extract_ns.add(time.perf_counter_ns() - t0)
+                    record(meta)
+        return Gst.FlowReturn.OK
+
+    pipeline.get_by_name("sink").connect("new-sample", on_sample)
+
+    loop = GLib.MainLoop()
+
+    def on_msg(bus, msg):
+        if msg.type == Gst.MessageType.ERROR:
+            err, _dbg = msg.parse_error()
+            print(f"❌ ERROR: {err}")
+            loop.quit()
+        elif msg.type == Gst.MessageType.EOS:
+            loop.quit()
+
+    bus = pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", on_msg)
+
+    cpu0 = os.times()
+    wall0 = time.perf_counter()
+    pipeline.set_state(Gst.State.PLAYING)
+    loop.run()
+    pipeline.set_state(Gst.State.NULL)
+    wall = time.perf_counter() - wall0
+    cpu1 = os.times()
+    cpu = (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system)
+
+    return {
+        "transport": transport,
+        "frames": frame_no[0],
+        "received": received[0],
+        "skipped": injector.skipped if transport != "sei" else 0,
+        "payload_bytes": payload_bytes,
+        "inject_us": inject_ns.summary(1e-3),
+        "extract_us": extract_ns.summary(1e-3),
+        "latency_ms": latency_ns.summary(1e-6),
+        "cpu_ms_per_frame": round(1000 * cpu / max(frame_no[0], 1), 3),
+        "wall_s": round(wall, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare SEI (element / probe) vs RTP header-extension "
+                                             "metadata transport")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--detections", type=int, default=10, help="fake detections per frame")
+    args = ap.parse_args()
+
+    print("=" * 60)
+    print(f"Transport benchmark: {args.frames} frames {args.width}x{args.height}, "
+          f"{args.detections} detections/frame")
+    print("=" * 60)
+    failures = 0
+    for transport in ("sei", "sei-probe", "hdrext"):
+        result = run_transport(transport, args.frames, args.width, args.height, args.detections)
+        print(json.dumps(result, indent=2))
+        # timings of a transport that delivers nothing are meaningless
+        if result["received"] == 0:
+            print(f"❌ {transport}: no payloads received ({result['skipped']} skipped)")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())